@@ -1,6 +1,33 @@
+import asyncio
+from collections.abc import Generator
 from typing import Any
 
 import anthropic
+import httpx
+from llm_cache import LLMCache
+
+# Anthropic clients shared per API key so every generator reuses the same
+# keep-alive connection pool instead of paying a new TCP/TLS handshake
+_CLIENT_CACHE: dict[str, anthropic.Anthropic] = {}
+
+_CONNECTION_LIMITS = httpx.Limits(
+    max_keepalive_connections=20, max_connections=100, keepalive_expiry=30.0
+)
+
+# Shared by every request; the SDK only reads it when building the request body
+_TOOL_CHOICE_AUTO = {"type": "auto"}
+
+
+def _get_client(api_key: str) -> anthropic.Anthropic:
+    """Return the shared Anthropic client for an API key, creating it on first use"""
+    client = _CLIENT_CACHE.get(api_key)
+    if client is None:
+        client = anthropic.Anthropic(
+            api_key=api_key,
+            http_client=anthropic.DefaultHttpxClient(limits=_CONNECTION_LIMITS),
+        )
+        _CLIENT_CACHE[api_key] = client
+    return client
 
 
 class AIGenerator:
@@ -37,12 +64,72 @@ All responses must be:
 4. **Example-supported** - Include relevant examples when helpful
 """
 
-    def __init__(self, api_key: str, model: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    # System prompt as a prompt-cached content block, built once so the
+    # cacheable prefix is byte-identical on every request
+    _CACHED_SYSTEM_BLOCK = (
+        {
+            "type": "text",
+            "text": SYSTEM_PROMPT,
+            "cache_control": {"type": "ephemeral"},
+        },
+    )
+
+    # Maximum sequential tool rounds per query
+    MAX_TOOL_ROUNDS = 2
+
+    # Fallback answer when the last tool round produced no text
+    NO_RESPONSE_TEXT = "Unable to generate response after tool execution."
+
+    # Beta that reduces output tokens spent on tool_use blocks
+    TOKEN_EFFICIENT_TOOLS_BETA = "token-efficient-tools-2025-02-19"
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        client=None,
+        async_client=None,
+        cache: LLMCache | None = None,
+        token_efficient_tools: bool = True,
+    ):
+        # Allow injecting a client (e.g. a mock); otherwise reuse the shared one
+        self.client = client if client is not None else _get_client(api_key)
         self.model = model
 
+        # Optional response cache consulted before calling the API
+        self.cache = cache
+
+        # The token-efficient tool use beta only applies to Claude 3.7 Sonnet;
+        # Claude 4 models already emit compact tool calls without it
+        self.token_efficient_tools = token_efficient_tools and model.startswith(
+            "claude-3-7"
+        )
+
+        # Async client is created lazily on the first async request
+        self._api_key = api_key
+        self._async_client = async_client
+
         # Pre-build base API parameters
         self.base_params = {"model": self.model, "temperature": 0, "max_tokens": 800}
+        self._api_template_with_tools = {
+            **self.base_params,
+            "tool_choice": _TOOL_CHOICE_AUTO,
+        }
+
+        # Token usage from the most recent API call (includes prompt cache stats)
+        self.last_usage: dict[str, Any] = {}
+
+    @property
+    def aclient(self) -> anthropic.AsyncAnthropic:
+        """Async Anthropic client with its own keep-alive connection pool"""
+        if self._async_client is None:
+            self._async_client = anthropic.AsyncAnthropic(
+                api_key=self._api_key,
+                http_client=anthropic.DefaultAsyncHttpxClient(
+                    limits=_CONNECTION_LIMITS
+                ),
+            )
+        return self._async_client
 
     def generate_response(
         self,
@@ -50,6 +137,7 @@ All responses must be:
         conversation_history: str | None = None,
         tools: list | None = None,
         tool_manager=None,
+        semantic_query: str | None = None,
     ) -> str:
         """
         Generate AI response with optional tool usage and conversation context.
@@ -59,97 +147,427 @@ All responses must be:
             conversation_history: Previous messages for context
             tools: Available tools the AI can use
             tool_manager: Manager to execute tools
+            semantic_query: The raw user question for paraphrase matching in
+                the response cache; defaults to query
 
         Returns:
             Generated response as string
         """
+        # Serve repeated or paraphrased questions without an API round-trip
+        cached, cache_entry = self._check_cache(
+            query, conversation_history, tools, semantic_query
+        )
+        if cached is not None:
+            return cached
+
+        # Without tools Claude cannot request tool use, so skip that machinery
+        if not tools:
+            response = self._generate_simple(query, conversation_history)
+            return self._store_in_cache(response, cache_entry)
 
-        # Build system content efficiently - avoid string ops when possible
-        system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
-            if conversation_history
-            else self.SYSTEM_PROMPT
+        return self._generate_with_tools(
+            query, conversation_history, tools, tool_manager, cache_entry
         )
 
-        # Prepare API call parameters efficiently
-        api_params = {
+    def _generate_simple(self, query: str, conversation_history: str | None):
+        """Single API call without tools; returns the raw response"""
+        response = self.client.messages.create(
             **self.base_params,
-            "messages": [{"role": "user", "content": query}],
-            "system": system_content,
-        }
+            messages=[{"role": "user", "content": query}],
+            system=self._build_system(conversation_history),
+        )
+        self._record_usage(response)
+        return response
 
-        # Add tools if available
-        if tools:
-            api_params["tools"] = tools
-            api_params["tool_choice"] = {"type": "auto"}
+    def _generate_with_tools(
+        self,
+        query: str,
+        conversation_history: str | None,
+        tools: list,
+        tool_manager,
+        cache_entry: tuple | None,
+    ) -> str:
+        """API call with tools, running the tool loop when Claude requests it"""
+        api_params = self._build_api_params(query, conversation_history, tools)
 
         # Get response from Claude
-        response = self.client.messages.create(**api_params)
+        response = self._create_message(api_params)
 
         # Handle tool execution if needed
         if response.stop_reason == "tool_use" and tool_manager:
             return self._handle_tool_execution(response, api_params, tool_manager)
 
         # Return direct response
-        return response.content[0].text
+        return self._store_in_cache(response, cache_entry)
+
+    async def agenerate_response(
+        self,
+        query: str,
+        conversation_history: str | None = None,
+        tools: list | None = None,
+        tool_manager=None,
+        semantic_query: str | None = None,
+    ) -> str:
+        """
+        Async variant of generate_response that never blocks the event loop.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+            semantic_query: The raw user question for paraphrase matching in
+                the response cache; defaults to query
+
+        Returns:
+            Generated response as string
+        """
+        # Embedding the question is blocking model inference, so run it off the loop
+        cached, cache_entry = await asyncio.to_thread(
+            self._check_cache, query, conversation_history, tools, semantic_query
+        )
+        if cached is not None:
+            return cached
+
+        api_params = self._build_api_params(query, conversation_history, tools)
+
+        response = await self._acreate_message(api_params)
+
+        if response.stop_reason == "tool_use" and tool_manager:
+            return await self._handle_tool_execution_async(
+                response, api_params, tool_manager
+            )
+
+        return self._store_in_cache(response, cache_entry)
+
+    def generate_response_stream(
+        self,
+        query: str,
+        conversation_history: str | None = None,
+        tools: list | None = None,
+        tool_manager=None,
+        semantic_query: str | None = None,
+    ) -> Generator[dict[str, str], None, str]:
+        """
+        Stream the AI response as text and status events.
+
+        A round that cannot end in tool use (no tools offered, or the last
+        allowed round) is streamed token by token. A round that may still call
+        a tool is held until its stop reason is known: its text is then sent as
+        answer text if the round is final, or as a status event if it preceded
+        a tool call, so preamble like "Let me search" never joins the answer.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+            semantic_query: The raw user question for paraphrase matching in
+                the response cache; defaults to query
+
+        Yields:
+            {"type": "text", "text": chunk} for answer text and
+            {"type": "status", "text": preamble} for text written before tool use
+
+        Returns:
+            The final round's text, the same answer generate_response() gives
+        """
+        cached, cache_entry = self._check_cache(
+            query, conversation_history, tools, semantic_query
+        )
+        if cached is not None:
+            yield {"type": "text", "text": cached}
+            return cached
+
+        api_params = self._build_api_params(query, conversation_history, tools)
+        messages = api_params["messages"]
+        can_use_tools = bool(tools) and tool_manager is not None
+
+        for round_number in range(self.MAX_TOOL_ROUNDS + 1):
+            is_last_round = round_number == self.MAX_TOOL_ROUNDS
+            held_text = []
+            with self._stream_message(api_params) as stream:
+                for text in stream.text_stream:
+                    if can_use_tools and not is_last_round:
+                        held_text.append(text)
+                    else:
+                        yield {"type": "text", "text": text}
+                response = stream.get_final_message()
+            self._record_usage(response)
+
+            runs_tools = (
+                can_use_tools
+                and not is_last_round
+                and response.stop_reason == "tool_use"
+            )
+            if held_text:
+                kind = "status" if runs_tools else "text"
+                yield {"type": kind, "text": "".join(held_text)}
+            if not runs_tools:
+                break
+
+            self._run_tool_round(messages, response, tool_manager)
+
+        if round_number == 0:
+            return self._store_in_cache(response, cache_entry)
+
+        answer = self._extract_text(response)
+        if not answer and response.stop_reason == "tool_use":
+            # Tool rounds ran out, as in _handle_tool_execution
+            answer = self.NO_RESPONSE_TEXT
+            yield {"type": "text", "text": answer}
+        return answer
+
+    def _check_cache(
+        self,
+        query: str,
+        conversation_history: str | None,
+        tools: list | None,
+        semantic_query: str | None,
+    ):
+        """
+        Look up a cached response for the query.
+
+        Returns:
+            Tuple of (cached response or None, cache entry for _store_in_cache:
+            (key, query embedding, scope) or None without a cache)
+        """
+        if self.cache is None:
+            return None, None
+
+        # Answers depend on which model and tools produced them, so both the
+        # exact key and the scope of paraphrase matches include them
+        tool_names = [tool["name"] for tool in tools] if tools else []
+        cache_key = self.cache.make_key(
+            self.model, query, conversation_history, tool_names
+        )
+        scope = self.cache.make_scope(self.model, tool_names)
+        # Paraphrase matching only makes sense without conversation context;
+        # the raw question is compared so a shared prompt wrapper adds no noise
+        cached, embedding = self.cache.lookup(
+            cache_key,
+            semantic_query or query,
+            semantic=conversation_history is None,
+            scope=scope,
+        )
+        return cached, (cache_key, embedding, scope)
+
+    def _store_in_cache(self, response, cache_entry: tuple | None) -> str:
+        """Return the response text, caching it if it is a complete direct answer"""
+        text = self._extract_text(response)
+
+        # Only answers that finished without tool use are deterministic to reuse
+        if cache_entry is not None and response.stop_reason == "end_turn":
+            cache_key, embedding, scope = cache_entry
+            self.cache.set(cache_key, embedding, text, scope=scope)
+
+        return text
+
+    def _build_system(self, conversation_history: str | None):
+        """Build system content: the shared cached prompt plus optional history"""
+        if not conversation_history:
+            return self._CACHED_SYSTEM_BLOCK
+
+        # History changes every turn, so it goes in a separate, uncached block
+        # after the shared cached prompt block
+        return [
+            *self._CACHED_SYSTEM_BLOCK,
+            {
+                "type": "text",
+                "text": f"Previous conversation:\n{conversation_history}",
+            },
+        ]
+
+    def _build_api_params(
+        self,
+        query: str,
+        conversation_history: str | None,
+        tools: list | None,
+    ) -> dict[str, Any]:
+        """Build the initial messages.create parameters for a query"""
+        # Copy the pre-built template and fill in the per-query keys
+        api_params = (
+            self._api_template_with_tools if tools else self.base_params
+        ).copy()
+        api_params["messages"] = [{"role": "user", "content": query}]
+        api_params["system"] = self._build_system(conversation_history)
+
+        # Add tools if available, caching the tool schemas via the last tool
+        if tools:
+            api_params["tools"] = [
+                *tools[:-1],
+                {**tools[-1], "cache_control": {"type": "ephemeral"}},
+            ]
+
+        return api_params
 
     def _handle_tool_execution(
-        self, initial_response, base_params: dict[str, Any], tool_manager
+        self, initial_response, api_params: dict[str, Any], tool_manager
     ):
         """
         Handle execution of tool calls with support for sequential tool rounds.
 
         Args:
             initial_response: The response containing tool use requests
-            base_params: Base API parameters (includes tools)
+            api_params: Parameters of the initial request (includes tools);
+                reused for follow-up calls with messages appended in place
             tool_manager: Manager to execute tools
 
         Returns:
             Final response text after tool execution
         """
-        MAX_TOOL_ROUNDS = 2
         current_response = initial_response
-        messages = base_params["messages"].copy()
+        # Params are built per query, so extend the message list in place;
+        # system and tools stay identical so the prompt cache prefix matches
+        messages = api_params["messages"]
+
+        for _ in range(self.MAX_TOOL_ROUNDS):
+            # Add assistant's tool_use response, then execute tools and add results
+            self._run_tool_round(messages, current_response, tool_manager)
+
+            current_response = self._create_message(api_params)
 
-        for _ in range(MAX_TOOL_ROUNDS):
-            # Add assistant's tool_use response
+            # Exit early if Claude doesn't need more tools
+            if current_response.stop_reason != "tool_use":
+                return self._extract_text(current_response)
+
+        # Max rounds reached - return whatever text the final response has
+        return self._extract_text(current_response, self.NO_RESPONSE_TEXT)
+
+    async def _handle_tool_execution_async(
+        self, initial_response, api_params: dict[str, Any], tool_manager
+    ):
+        """
+        Async tool loop; independent tool calls within a round run concurrently.
+
+        Args:
+            initial_response: The response containing tool use requests
+            api_params: Parameters of the initial request (includes tools);
+                reused for follow-up calls with messages appended in place
+            tool_manager: Manager to execute tools
+
+        Returns:
+            Final response text after tool execution
+        """
+        current_response = initial_response
+        # Params are built per query, so extend the message list in place;
+        # system and tools stay identical so the prompt cache prefix matches
+        messages = api_params["messages"]
+
+        for _ in range(self.MAX_TOOL_ROUNDS):
             messages.append({"role": "assistant", "content": current_response.content})
 
-            # Execute all tool calls and collect results
-            tool_results = []
-            for content_block in current_response.content:
-                if content_block.type == "tool_use":
-                    tool_result = tool_manager.execute_tool(
-                        content_block.name, **content_block.input
-                    )
-                    tool_results.append(
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": content_block.id,
-                            "content": tool_result,
-                        }
+            # Tools are blocking (vector store lookups), so run each in a thread;
+            # every call returns its own sources instead of sharing tool state
+            tool_blocks = self._tool_use_blocks(current_response)
+            outcomes = await asyncio.gather(
+                *(
+                    asyncio.to_thread(
+                        tool_manager.execute_tool_with_sources,
+                        block.name,
+                        **block.input,
                     )
+                    for block in tool_blocks
+                )
+            )
 
-            if tool_results:
-                messages.append({"role": "user", "content": tool_results})
+            # Record sources in block order, as the sequential loop would leave them
+            for block, (_, sources) in zip(tool_blocks, outcomes, strict=True):
+                tool_manager.record_sources(block.name, sources)
 
-            # Keep tools in API params for potential follow-up calls
-            api_params = {
-                **self.base_params,
-                "messages": messages,
-                "system": base_params["system"],
-                "tools": base_params.get("tools"),
-                "tool_choice": {"type": "auto"},
-            }
+            if tool_blocks:
+                tool_outputs = [output for output, _ in outcomes]
+                messages.append(self._tool_result_message(tool_blocks, tool_outputs))
 
-            current_response = self.client.messages.create(**api_params)
+            current_response = await self._acreate_message(api_params)
 
-            # Exit early if Claude doesn't need more tools
             if current_response.stop_reason != "tool_use":
-                return current_response.content[0].text
+                return self._extract_text(current_response)
+
+        # Max rounds reached - return whatever text the final response has
+        return self._extract_text(current_response, self.NO_RESPONSE_TEXT)
+
+    def _run_tool_round(self, messages: list, response, tool_manager):
+        """Append the assistant's tool_use turn and the executed tool results"""
+        messages.append({"role": "assistant", "content": response.content})
+
+        tool_blocks = self._tool_use_blocks(response)
+        tool_outputs = [
+            tool_manager.execute_tool(block.name, **block.input)
+            for block in tool_blocks
+        ]
+
+        if tool_blocks:
+            messages.append(self._tool_result_message(tool_blocks, tool_outputs))
+
+    @staticmethod
+    def _tool_use_blocks(response) -> list:
+        """Return the tool_use content blocks of a response"""
+        return [block for block in response.content if block.type == "tool_use"]
+
+    @staticmethod
+    def _tool_result_message(tool_blocks: list, tool_outputs: list) -> dict[str, Any]:
+        """Build the user message carrying tool results back to Claude"""
+        return {
+            "role": "user",
+            "content": [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": block.id,
+                    "content": output,
+                }
+                for block, output in zip(tool_blocks, tool_outputs, strict=True)
+            ],
+        }
 
-        # Max rounds reached - extract text from final response
-        for block in current_response.content:
-            if hasattr(block, "text"):
-                return block.text
-        return "Unable to generate response after tool execution."
+    @staticmethod
+    def _extract_text(response, default: str = "") -> str:
+        """Return the text of the first text block in a response"""
+        return next(
+            (block.text for block in response.content if block.type == "text"),
+            default,
+        )
+
+    def _create_message(self, api_params: dict[str, Any]):
+        """Call the Messages API, opting into token-efficient tools when enabled"""
+        if self.token_efficient_tools and "tools" in api_params:
+            response = self.client.beta.messages.create(
+                **api_params, betas=[self.TOKEN_EFFICIENT_TOOLS_BETA]
+            )
+        else:
+            response = self.client.messages.create(**api_params)
+
+        self._record_usage(response)
+        return response
+
+    def _stream_message(self, api_params: dict[str, Any]):
+        """Open a Messages API stream, opting into token-efficient tools when enabled"""
+        if self.token_efficient_tools and "tools" in api_params:
+            return self.client.beta.messages.stream(
+                **api_params, betas=[self.TOKEN_EFFICIENT_TOOLS_BETA]
+            )
+        return self.client.messages.stream(**api_params)
+
+    async def _acreate_message(self, api_params: dict[str, Any]):
+        """Async counterpart of _create_message"""
+        if self.token_efficient_tools and "tools" in api_params:
+            response = await self.aclient.beta.messages.create(
+                **api_params, betas=[self.TOKEN_EFFICIENT_TOOLS_BETA]
+            )
+        else:
+            response = await self.aclient.messages.create(**api_params)
+
+        self._record_usage(response)
+        return response
+
+    def _record_usage(self, response) -> None:
+        """Store token usage of a response, including prompt cache reads/writes"""
+        # Every Message carries usage; the cache counters are None when the
+        # request touched no cache breakpoints
+        usage = response.usage
+        self.last_usage = {
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "cache_creation_input_tokens": usage.cache_creation_input_tokens or 0,
+            "cache_read_input_tokens": usage.cache_read_input_tokens or 0,
+        }
@@ -3,18 +3,26 @@ import warnings
 warnings.filterwarnings("ignore", message="resource_tracker: There appear to be.*")
 
 import os
+from collections.abc import Iterator
 from typing import Any
 
+import orjson
 from config import config
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from rag_system import RAGSystem
 
 # Initialize FastAPI app
-app = FastAPI(title="Course Materials RAG System", root_path="")
+# orjson serializes response payloads (notably sources lists) faster than json
+app = FastAPI(
+    title="Course Materials RAG System",
+    root_path="",
+    default_response_class=ORJSONResponse,
+)
 
 # Add trusted host middleware for proxy
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
@@ -59,17 +67,36 @@ class CourseStats(BaseModel):
 # API Endpoints
 
 
+def _sse_events(query: str, session_id: str) -> Iterator[str]:
+    """Format a streamed RAG answer as server-sent events"""
+    try:
+        for event in rag_system.query_stream(query, session_id):
+            if event["type"] == "done":
+                event = {**event, "session_id": session_id}
+            yield f"data: {orjson.dumps(event).decode()}\n\n"
+    except Exception as e:
+        # Headers are already sent, so report the failure as a final event
+        error = {"type": "error", "detail": str(e)}
+        yield f"data: {orjson.dumps(error).decode()}\n\n"
+
+
 @app.post("/api/query", response_model=QueryResponse)
-async def query_documents(request: QueryRequest):
-    """Process a query and return response with sources"""
+async def query_documents(request: QueryRequest, stream: bool = False):
+    """Process a query and return response with sources (or an SSE stream)"""
     try:
         # Create session if not provided
         session_id = request.session_id
         if not session_id:
             session_id = rag_system.session_manager.create_session()
 
+        # Stream tokens as server-sent events when requested (?stream=1)
+        if stream:
+            return StreamingResponse(
+                _sse_events(request.query, session_id), media_type="text/event-stream"
+            )
+
         # Process query using RAG system
-        answer, sources = rag_system.query(request.query, session_id)
+        answer, sources = await rag_system.aquery(request.query, session_id)
 
         return QueryResponse(answer=answer, sources=sources, session_id=session_id)
     except Exception as e:
@@ -24,6 +24,10 @@ class Config:
     MAX_RESULTS: int = 5  # Maximum search results to return
     MAX_HISTORY: int = 2  # Number of conversation messages to remember
 
+    # Response cache settings
+    RESPONSE_CACHE_SIZE: int = 1000  # Maximum cached AI responses
+    RESPONSE_CACHE_SIMILARITY: float = 0.92  # Cosine threshold for paraphrase hits
+
     # Database paths
     CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location
 
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+
+import numpy as np
+
+
+class LLMCache:
+    """In-memory LRU cache of AI responses with exact and semantic lookup"""
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        similarity_threshold: float = 0.92,
+        embedder=None,
+    ):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        # Optional SentenceTransformer-style model with encode(); without it
+        # only exact-match lookups are performed
+        self.embedder = embedder
+
+        # key -> (normalized query embedding or None, response, scope)
+        self._entries: OrderedDict[str, tuple[np.ndarray | None, str, str | None]] = (
+            OrderedDict()
+        )
+        self.stats = {"hits": 0, "misses": 0}
+        # Sync and streaming requests run in worker threads while async ones
+        # run on the event loop; every access to _entries and stats is locked
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        model: str, query: str, history: str | None, tools: Sequence[str] = ()
+    ) -> str:
+        """Build the exact-match key for a query in a given context and tool set"""
+        payload = json.dumps(
+            {"m": model, "q": query, "h": history, "t": list(tools)}, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_scope(model: str, tools: Sequence[str] = ()) -> str:
+        """Build the scope within which paraphrased queries may share a response"""
+        return json.dumps({"m": model, "t": list(tools)}, sort_keys=True)
+
+    def embed(self, text: str) -> np.ndarray | None:
+        """Embed and L2-normalize text for cosine comparison"""
+        if self.embedder is None:
+            return None
+
+        return self.embedder.encode(
+            text, convert_to_numpy=True, normalize_embeddings=True
+        ).astype(np.float32, copy=False)
+
+    def get_exact(self, key: str) -> str | None:
+        """Return the cached response for an exact key match"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def get_semantic(
+        self,
+        embedding: np.ndarray | None,
+        threshold: float | None = None,
+        scope: str | None = None,
+    ) -> str | None:
+        """Return the response of the most similar cached query in scope above threshold"""
+        if embedding is None:
+            return None
+
+        if threshold is None:
+            threshold = self.similarity_threshold
+
+        with self._lock:
+            # Only entries produced by the same model and tools are candidates
+            keys = [
+                key
+                for key, (emb, _, entry_scope) in self._entries.items()
+                if emb is not None and entry_scope == scope
+            ]
+            if not keys:
+                return None
+
+            stored = np.stack([self._entries[key][0] for key in keys])
+            scores = stored @ embedding
+            best = int(np.argmax(scores))
+
+            if scores[best] < threshold:
+                return None
+
+            self._entries.move_to_end(keys[best])
+            return self._entries[keys[best]][1]
+
+    def lookup(
+        self, key: str, query: str, semantic: bool = True, scope: str | None = None
+    ) -> tuple[str | None, np.ndarray | None]:
+        """
+        Look up a response, trying the exact key first and then similar queries.
+
+        Args:
+            key: Exact-match key from make_key()
+            query: Raw query text used for semantic matching
+            semantic: Whether to fall back to embedding similarity
+            scope: Scope from make_scope() that similar queries must share
+
+        Returns:
+            Tuple of (cached response or None, query embedding for a later set())
+        """
+        response = self.get_exact(key)
+        embedding = None
+
+        if response is None and semantic:
+            embedding = self.embed(query)
+            response = self.get_semantic(embedding, scope=scope)
+
+        with self._lock:
+            self.stats["hits" if response is not None else "misses"] += 1
+        return response, embedding
+
+    def set(
+        self,
+        key: str,
+        embedding: np.ndarray | None,
+        response: str,
+        scope: str | None = None,
+    ):
+        """Store a response, evicting the least recently used entry when full"""
+        with self._lock:
+            self._entries[key] = (embedding, response, scope)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached responses"""
+        with self._lock:
+            self._entries.clear()
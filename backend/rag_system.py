@@ -1,7 +1,10 @@
 import os
+from collections.abc import Iterator
+from typing import Any
 
 from ai_generator import AIGenerator
 from document_processor import DocumentProcessor
+from llm_cache import LLMCache
 from models import Course
 from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
 from session_manager import SessionManager
@@ -21,17 +24,31 @@ class RAGSystem:
         self.vector_store = VectorStore(
             config.CHROMA_PATH, config.EMBEDDING_MODEL, config.MAX_RESULTS
         )
+        # Response cache reuses the vector store's embedding model
+        self.response_cache = LLMCache(
+            config.RESPONSE_CACHE_SIZE,
+            config.RESPONSE_CACHE_SIMILARITY,
+            embedder=self.vector_store.embedder,
+        )
         self.ai_generator = AIGenerator(
-            config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL
+            config.ANTHROPIC_API_KEY,
+            config.ANTHROPIC_MODEL,
+            cache=self.response_cache,
         )
         self.session_manager = SessionManager(config.MAX_HISTORY)
 
-        # Initialize search tools
-        self.tool_manager = ToolManager()
-        self.search_tool = CourseSearchTool(self.vector_store)
-        self.tool_manager.register_tool(self.search_tool)
-        self.outline_tool = CourseOutlineTool(self.vector_store)
-        self.tool_manager.register_tool(self.outline_tool)
+    def _create_tool_manager(self) -> ToolManager:
+        """
+        Build a ToolManager with fresh search tools for a single query.
+
+        Tools record the sources of their last search, so each query gets its
+        own instances; concurrent queries then never read or reset each
+        other's sources.
+        """
+        tool_manager = ToolManager()
+        tool_manager.register_tool(CourseSearchTool(self.vector_store))
+        tool_manager.register_tool(CourseOutlineTool(self.vector_store))
+        return tool_manager
 
     def add_course_document(self, file_path: str) -> tuple[Course, int]:
         """
@@ -118,16 +135,16 @@ class RAGSystem:
 
         return total_courses, total_chunks
 
-    def query(self, query: str, session_id: str | None = None) -> tuple[str, list[str]]:
+    def _prepare_query(self, query: str, session_id: str | None) -> dict[str, Any]:
         """
-        Process a user query using the RAG system with tool-based search.
+        Build the generator keyword arguments shared by every query variant.
 
         Args:
             query: User's question
             session_id: Optional session ID for conversation context
 
         Returns:
-            Tuple of (response, sources list - empty for tool-based approach)
+            Keyword arguments for the AIGenerator response methods
         """
         # Create prompt for the AI with clear instructions
         prompt = f"""Answer this question about course materials: {query}"""
@@ -137,27 +154,107 @@ class RAGSystem:
         if session_id:
             history = self.session_manager.get_conversation_history(session_id)
 
-        # Generate response using AI with tools
-        response = self.ai_generator.generate_response(
-            query=prompt,
-            conversation_history=history,
-            tools=self.tool_manager.get_tool_definitions(),
-            tool_manager=self.tool_manager,
-        )
+        tool_manager = self._create_tool_manager()
+        return {
+            "query": prompt,
+            "conversation_history": history,
+            "tools": tool_manager.get_tool_definitions(),
+            "tool_manager": tool_manager,
+            "semantic_query": query,
+        }
 
-        # Get sources from the search tool
-        sources = self.tool_manager.get_last_sources()
+    def _finish_query(
+        self,
+        query: str,
+        session_id: str | None,
+        response: str,
+        tool_manager: ToolManager,
+    ) -> list[str]:
+        """
+        Collect the query's sources and record the exchange in its session.
 
-        # Reset sources after retrieving them
-        self.tool_manager.reset_sources()
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+            response: The final answer given to the user
+            tool_manager: The query's own tool manager, discarded afterwards
+
+        Returns:
+            Sources from the query's tool searches
+        """
+        sources = tool_manager.get_last_sources()
 
         # Update conversation history
         if session_id:
             self.session_manager.add_exchange(session_id, query, response)
 
-        # Return response with sources from tool searches
+        return sources
+
+    def query(self, query: str, session_id: str | None = None) -> tuple[str, list[str]]:
+        """
+        Process a user query using the RAG system with tool-based search.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Returns:
+            Tuple of (response, sources list - empty for tool-based approach)
+        """
+        generate_kwargs = self._prepare_query(query, session_id)
+        response = self.ai_generator.generate_response(**generate_kwargs)
+        sources = self._finish_query(
+            query, session_id, response, generate_kwargs["tool_manager"]
+        )
+        return response, sources
+
+    async def aquery(
+        self, query: str, session_id: str | None = None
+    ) -> tuple[str, list[str]]:
+        """
+        Async variant of query() that keeps the event loop free during generation.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Returns:
+            Tuple of (response, sources list - empty for tool-based approach)
+        """
+        generate_kwargs = self._prepare_query(query, session_id)
+        response = await self.ai_generator.agenerate_response(**generate_kwargs)
+        sources = self._finish_query(
+            query, session_id, response, generate_kwargs["tool_manager"]
+        )
         return response, sources
 
+    def query_stream(
+        self, query: str, session_id: str | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Stream a query response as events.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Yields:
+            {"type": "text", "text": chunk} events while the answer is generated,
+            {"type": "status", "text": ...} events for text written before a
+            tool call, then a final {"type": "done", "sources": [...]} event
+        """
+        generate_kwargs = self._prepare_query(query, session_id)
+        # The stream returns the final answer, which excludes status text sent
+        # before a tool call, so history matches the non-streaming path
+        answer = yield from self.ai_generator.generate_response_stream(
+            **generate_kwargs
+        )
+
+        sources = self._finish_query(
+            query, session_id, answer, generate_kwargs["tool_manager"]
+        )
+        yield {"type": "done", "sources": sources}
+
     def get_course_analytics(self) -> dict:
         """Get analytics about the course catalog"""
         return {
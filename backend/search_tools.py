@@ -1,3 +1,4 @@
+import copy
 from abc import ABC, abstractmethod
 from typing import Any
 
@@ -184,6 +185,30 @@ class ToolManager:
 
         return self.tools[tool_name].execute(**kwargs)
 
+    def execute_tool_with_sources(self, tool_name: str, **kwargs) -> tuple[str, list]:
+        """
+        Execute a tool on a private copy and return its result with its sources.
+
+        Registered tools are left untouched, so several calls can run at once
+        without overwriting each other's last_sources; pass the sources to
+        record_sources() to keep them.
+        """
+        if tool_name not in self.tools:
+            return f"Tool '{tool_name}' not found", []
+
+        # A shallow copy shares the vector store but gets its own last_sources
+        tool = copy.copy(self.tools[tool_name])
+        if hasattr(tool, "last_sources"):
+            tool.last_sources = []
+
+        result = tool.execute(**kwargs)
+        return result, getattr(tool, "last_sources", [])
+
+    def record_sources(self, tool_name: str, sources: list):
+        """Keep sources from execute_tool_with_sources() as execute_tool() would"""
+        if sources and tool_name in self.tools:
+            self.tools[tool_name].last_sources = sources
+
     def get_last_sources(self) -> list:
         """Get sources from the last search operation"""
         # Check all tools for last_sources attribute
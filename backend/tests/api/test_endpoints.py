@@ -4,13 +4,17 @@ API endpoint tests for the RAG chatbot.
 This module creates a test-specific FastAPI app to avoid import issues
 with static file mounting in the main app.py.
 """
+import json
+from typing import Any
+from unittest.mock import MagicMock
+
+import orjson
 import pytest
+import pytest_asyncio
 from fastapi import FastAPI, HTTPException
-from fastapi.testclient import TestClient
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from httpx import ASGITransport, AsyncClient
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from unittest.mock import MagicMock, patch
-
 
 # =============================================================================
 # Test App Definition (mirrors app.py without static file mounting)
@@ -19,35 +23,65 @@ from unittest.mock import MagicMock, patch
 class QueryRequest(BaseModel):
     """Request model for course queries"""
     query: str
-    session_id: Optional[str] = None
+    session_id: str | None = None
 
 
 class QueryResponse(BaseModel):
     """Response model for course queries"""
     answer: str
-    sources: List[Dict[str, Any]]
+    sources: list[dict[str, Any]]
     session_id: str
 
 
 class CourseStats(BaseModel):
     """Response model for course statistics"""
     total_courses: int
-    course_titles: List[str]
+    course_titles: list[str]
 
 
 def create_test_app(mock_rag_system: MagicMock) -> FastAPI:
     """Create a test FastAPI app with mocked RAG system."""
-    app = FastAPI(title="Course Materials RAG System - Test")
+    app = FastAPI(
+        title="Course Materials RAG System - Test",
+        default_response_class=ORJSONResponse
+    )
+
+    # Resolve the mock's child methods once; each MagicMock attribute hop
+    # walks its child registry, and the endpoints run on every request.
+    # Safe because the app is built once per client fixture and tests only
+    # configure or reset these children, never replace them.
+    create_session = mock_rag_system.session_manager.create_session
+    aquery = mock_rag_system.aquery
+    query_stream = mock_rag_system.query_stream
+    get_course_analytics = mock_rag_system.get_course_analytics
+
+    def sse_events(query: str, session_id: str):
+        """Format a streamed RAG answer as server-sent events"""
+        try:
+            for event in query_stream(query, session_id):
+                if event["type"] == "done":
+                    event = {**event, "session_id": session_id}
+                yield f"data: {orjson.dumps(event).decode()}\n\n"
+        except Exception as e:
+            # Headers are already sent, so report the failure as a final event
+            error = {"type": "error", "detail": str(e)}
+            yield f"data: {orjson.dumps(error).decode()}\n\n"
 
     @app.post("/api/query", response_model=QueryResponse)
-    async def query_documents(request: QueryRequest):
-        """Process a query and return response with sources"""
+    async def query_documents(request: QueryRequest, stream: bool = False):
+        """Process a query and return response with sources (or an SSE stream)"""
         try:
             session_id = request.session_id
             if not session_id:
-                session_id = mock_rag_system.session_manager.create_session()
+                session_id = create_session()
+
+            if stream:
+                return StreamingResponse(
+                    sse_events(request.query, session_id),
+                    media_type="text/event-stream"
+                )
 
-            answer, sources = mock_rag_system.query(request.query, session_id)
+            answer, sources = await aquery(request.query, session_id)
 
             return QueryResponse(
                 answer=answer,
@@ -61,7 +95,7 @@ def create_test_app(mock_rag_system: MagicMock) -> FastAPI:
     async def get_course_stats():
         """Get course analytics and statistics"""
         try:
-            analytics = mock_rag_system.get_course_analytics()
+            analytics = get_course_analytics()
             return CourseStats(
                 total_courses=analytics["total_courses"],
                 course_titles=analytics["course_titles"]
@@ -81,18 +115,36 @@ def create_test_app(mock_rag_system: MagicMock) -> FastAPI:
 # Test Client Fixtures
 # =============================================================================
 
-@pytest.fixture
-def test_client(mock_rag_system):
-    """Create test client with mocked RAG system."""
+# Clients are module-scoped, so tests share the module's event loop
+pytestmark = pytest.mark.asyncio(loop_scope="module")
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def test_client(mock_rag_system):
+    """Create in-process async client with mocked RAG system (once per module)."""
     app = create_test_app(mock_rag_system)
-    return TestClient(app)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
 
 
-@pytest.fixture
-def test_client_with_errors(mock_rag_system_error):
-    """Create test client with RAG system that raises errors."""
+@pytest_asyncio.fixture(scope="module", loop_scope="module")
+async def test_client_with_errors(mock_rag_system_error):
+    """Create in-process async client with RAG system that raises errors."""
     app = create_test_app(mock_rag_system_error)
-    return TestClient(app)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def reset_rag_mocks(mock_rag_system, mock_rag_system_error):
+    """Clear recorded calls on the shared RAG mocks after each test."""
+    yield
+    mock_rag_system.reset_mock()
+    mock_rag_system_error.reset_mock()
 
 
 # =============================================================================
@@ -103,9 +155,9 @@ def test_client_with_errors(mock_rag_system_error):
 class TestQueryEndpoint:
     """Tests for POST /api/query endpoint."""
 
-    def test_query_success_without_session(self, test_client, sample_query_request):
+    async def test_query_success_without_session(self, test_client, sample_query_request):
         """Test successful query without existing session."""
-        response = test_client.post("/api/query", json=sample_query_request)
+        response = await test_client.post("/api/query", json=sample_query_request)
 
         assert response.status_code == 200
         data = response.json()
@@ -115,17 +167,17 @@ class TestQueryEndpoint:
         assert data["session_id"] == "test_session_123"
         assert "test response" in data["answer"].lower()
 
-    def test_query_success_with_session(self, test_client, sample_query_request_with_session):
+    async def test_query_success_with_session(self, test_client, sample_query_request_with_session):
         """Test successful query with existing session."""
-        response = test_client.post("/api/query", json=sample_query_request_with_session)
+        response = await test_client.post("/api/query", json=sample_query_request_with_session)
 
         assert response.status_code == 200
         data = response.json()
         assert data["session_id"] == "existing_session_456"
 
-    def test_query_returns_sources(self, test_client, sample_query_request):
+    async def test_query_returns_sources(self, test_client, sample_query_request):
         """Test that query returns source citations."""
-        response = test_client.post("/api/query", json=sample_query_request)
+        response = await test_client.post("/api/query", json=sample_query_request)
 
         assert response.status_code == 200
         data = response.json()
@@ -134,28 +186,28 @@ class TestQueryEndpoint:
         assert "title" in source
         assert "url" in source
 
-    def test_query_invalid_request_missing_query(self, test_client):
+    async def test_query_invalid_request_missing_query(self, test_client):
         """Test query with missing required field."""
-        response = test_client.post("/api/query", json={})
+        response = await test_client.post("/api/query", json={})
 
         assert response.status_code == 422  # Validation error
 
-    def test_query_invalid_request_wrong_type(self, test_client):
+    async def test_query_invalid_request_wrong_type(self, test_client):
         """Test query with wrong field type."""
-        response = test_client.post("/api/query", json={"query": 123})
+        response = await test_client.post("/api/query", json={"query": 123})
 
         assert response.status_code == 422
 
-    def test_query_empty_string(self, test_client):
+    async def test_query_empty_string(self, test_client):
         """Test query with empty string (should still process)."""
-        response = test_client.post("/api/query", json={"query": ""})
+        response = await test_client.post("/api/query", json={"query": ""})
 
         # Empty string is valid according to the model, RAG system handles it
         assert response.status_code == 200
 
-    def test_query_internal_error(self, test_client_with_errors, sample_query_request):
+    async def test_query_internal_error(self, test_client_with_errors, sample_query_request):
         """Test query endpoint handles internal errors gracefully."""
-        response = test_client_with_errors.post("/api/query", json=sample_query_request)
+        response = await test_client_with_errors.post("/api/query", json=sample_query_request)
 
         assert response.status_code == 500
         data = response.json()
@@ -163,6 +215,63 @@ class TestQueryEndpoint:
         assert "Internal RAG system error" in data["detail"]
 
 
+# =============================================================================
+# Streaming Query Tests
+# =============================================================================
+
+@pytest.mark.api
+class TestQueryStreaming:
+    """Tests for POST /api/query?stream=1."""
+
+    async def test_stream_returns_event_stream(self, test_client, sample_query_request):
+        """Test streamed query returns text events then a done event."""
+        response = await test_client.post(
+            "/api/query", params={"stream": 1}, json=sample_query_request
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+
+        events = [
+            json.loads(line[len("data: "):])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        text = "".join(e["text"] for e in events if e["type"] == "text")
+        assert "test response" in text.lower()
+
+        done = events[-1]
+        assert done["type"] == "done"
+        assert done["session_id"] == "test_session_123"
+        assert done["sources"][0]["title"] == "Test Course"
+
+    async def test_stream_error_sent_as_event(
+        self, test_client_with_errors, sample_query_request
+    ):
+        """Test a failure after headers are sent ends the stream with an error event."""
+        response = await test_client_with_errors.post(
+            "/api/query", params={"stream": 1}, json=sample_query_request
+        )
+
+        assert response.status_code == 200
+        events = [
+            json.loads(line[len("data: "):])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        assert events == [
+            {"type": "text", "text": "Partial"},
+            {"type": "error", "detail": "Stream failed"},
+        ]
+
+    async def test_non_stream_path_unchanged(self, test_client, sample_query_request):
+        """Test query without stream flag still returns JSON."""
+        response = await test_client.post("/api/query", json=sample_query_request)
+
+        assert response.status_code == 200
+        assert set(response.json().keys()) == {"answer", "sources", "session_id"}
+
+
 # =============================================================================
 # Courses Endpoint Tests
 # =============================================================================
@@ -171,9 +280,9 @@ class TestQueryEndpoint:
 class TestCoursesEndpoint:
     """Tests for GET /api/courses endpoint."""
 
-    def test_get_courses_success(self, test_client):
+    async def test_get_courses_success(self, test_client):
         """Test successful retrieval of course stats."""
-        response = test_client.get("/api/courses")
+        response = await test_client.get("/api/courses")
 
         assert response.status_code == 200
         data = response.json()
@@ -182,18 +291,18 @@ class TestCoursesEndpoint:
         assert data["total_courses"] == 3
         assert len(data["course_titles"]) == 3
 
-    def test_get_courses_returns_list(self, test_client):
+    async def test_get_courses_returns_list(self, test_client):
         """Test that course_titles is a list."""
-        response = test_client.get("/api/courses")
+        response = await test_client.get("/api/courses")
 
         assert response.status_code == 200
         data = response.json()
         assert isinstance(data["course_titles"], list)
         assert "Course A" in data["course_titles"]
 
-    def test_get_courses_internal_error(self, test_client_with_errors):
+    async def test_get_courses_internal_error(self, test_client_with_errors):
         """Test courses endpoint handles internal errors gracefully."""
-        response = test_client_with_errors.get("/api/courses")
+        response = await test_client_with_errors.get("/api/courses")
 
         assert response.status_code == 500
         data = response.json()
@@ -209,9 +318,9 @@ class TestCoursesEndpoint:
 class TestRootEndpoint:
     """Tests for GET / endpoint."""
 
-    def test_root_health_check(self, test_client):
+    async def test_root_health_check(self, test_client):
         """Test root endpoint returns health status."""
-        response = test_client.get("/")
+        response = await test_client.get("/")
 
         assert response.status_code == 200
         data = response.json()
@@ -226,23 +335,23 @@ class TestRootEndpoint:
 class TestRequestResponseModels:
     """Tests for request/response Pydantic models."""
 
-    def test_query_request_optional_session(self, test_client):
+    async def test_query_request_optional_session(self, test_client):
         """Test that session_id is truly optional."""
         # Without session_id
-        response1 = test_client.post("/api/query", json={"query": "test"})
+        response1 = await test_client.post("/api/query", json={"query": "test"})
         assert response1.status_code == 200
 
         # With explicit None
-        response2 = test_client.post("/api/query", json={"query": "test", "session_id": None})
+        response2 = await test_client.post("/api/query", json={"query": "test", "session_id": None})
         assert response2.status_code == 200
 
         # With session_id
-        response3 = test_client.post("/api/query", json={"query": "test", "session_id": "abc123"})
+        response3 = await test_client.post("/api/query", json={"query": "test", "session_id": "abc123"})
         assert response3.status_code == 200
 
-    def test_query_response_structure(self, test_client, sample_query_request):
+    async def test_query_response_structure(self, test_client, sample_query_request):
         """Test that query response has correct structure."""
-        response = test_client.post("/api/query", json=sample_query_request)
+        response = await test_client.post("/api/query", json=sample_query_request)
 
         assert response.status_code == 200
         data = response.json()
@@ -255,9 +364,9 @@ class TestRequestResponseModels:
         assert isinstance(data["sources"], list)
         assert isinstance(data["session_id"], str)
 
-    def test_course_stats_response_structure(self, test_client):
+    async def test_course_stats_response_structure(self, test_client):
         """Test that course stats response has correct structure."""
-        response = test_client.get("/api/courses")
+        response = await test_client.get("/api/courses")
 
         assert response.status_code == 200
         data = response.json()
@@ -278,32 +387,32 @@ class TestRequestResponseModels:
 class TestEdgeCases:
     """Edge case tests for API endpoints."""
 
-    def test_query_with_special_characters(self, test_client):
+    async def test_query_with_special_characters(self, test_client):
         """Test query with special characters."""
         special_query = "What about <script>alert('xss')</script>?"
-        response = test_client.post("/api/query", json={"query": special_query})
+        response = await test_client.post("/api/query", json={"query": special_query})
 
         # Should process without issues (RAG system handles sanitization)
         assert response.status_code == 200
 
-    def test_query_with_unicode(self, test_client):
+    async def test_query_with_unicode(self, test_client):
         """Test query with unicode characters."""
         unicode_query = "What about machine learning?"
-        response = test_client.post("/api/query", json={"query": unicode_query})
+        response = await test_client.post("/api/query", json={"query": unicode_query})
 
         assert response.status_code == 200
 
-    def test_query_with_very_long_input(self, test_client):
+    async def test_query_with_very_long_input(self, test_client):
         """Test query with very long input."""
         long_query = "What is " + "a" * 10000 + "?"
-        response = test_client.post("/api/query", json={"query": long_query})
+        response = await test_client.post("/api/query", json={"query": long_query})
 
         # Should process (may be truncated by RAG system)
         assert response.status_code == 200
 
-    def test_content_type_json_required(self, test_client):
+    async def test_content_type_json_required(self, test_client):
         """Test that JSON content type is required."""
-        response = test_client.post(
+        response = await test_client.post(
             "/api/query",
             content="query=test",
             headers={"Content-Type": "application/x-www-form-urlencoded"}
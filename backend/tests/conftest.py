@@ -1,109 +1,39 @@
 """
-Shared fixtures and mock builders for RAG chatbot tests.
+Shared fixtures for RAG chatbot tests.
+
+Mock builders live in helpers.py so test modules can import them directly.
 """
 
-import sys
-from pathlib import Path
-from typing import Any
-from unittest.mock import MagicMock, Mock
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import Mock, create_autospec, patch
 
 import pytest
-
-# Add backend to path for imports
-backend_path = Path(__file__).parent.parent
-sys.path.insert(0, str(backend_path))
-
-from models import Course, CourseChunk, Lesson
+from helpers import (
+    AnthropicClientStub,
+    VectorStoreStub,
+    build_claude_text_response,
+    build_claude_tool_use_response,
+    build_empty_search_results,
+    build_search_results,
+)
+from rag_system import RAGSystem
+from search_tools import CourseSearchTool, ToolManager
+from session_manager import SessionManager
 from vector_store import SearchResults
 
 # =============================================================================
-# Mock Response Builders
+# Shared Client Cache Fixture
 # =============================================================================
 
 
-def build_search_results(
-    documents: list[str],
-    metadata: list[dict[str, Any]],
-    distances: list[float] | None = None,
-    error: str | None = None,
-) -> SearchResults:
-    """Create SearchResults for testing."""
-    if distances is None:
-        distances = [0.5] * len(documents)
-    return SearchResults(
-        documents=documents, metadata=metadata, distances=distances, error=error
-    )
-
-
-def build_empty_search_results(error_msg: str = None) -> SearchResults:
-    """Create empty SearchResults."""
-    return (
-        SearchResults.empty(error_msg)
-        if error_msg
-        else SearchResults(documents=[], metadata=[], distances=[])
-    )
-
-
-def build_chroma_results(
-    documents: list[str],
-    metadata: list[dict[str, Any]],
-    distances: list[float] | None = None,
-) -> dict:
-    """Build mock ChromaDB query results format."""
-    if distances is None:
-        distances = [0.5] * len(documents)
-    return {"documents": [documents], "metadatas": [metadata], "distances": [distances]}
-
-
-def build_claude_text_response(text: str) -> Mock:
-    """Create mock Claude response with text content (no tool use)."""
-    text_block = Mock()
-    text_block.type = "text"
-    text_block.text = text
-
-    response = Mock()
-    response.stop_reason = "end_turn"
-    response.content = [text_block]
-
-    return response
-
-
-def build_claude_tool_use_response(
-    tool_name: str, tool_input: dict[str, Any], tool_id: str = "tool_123"
-) -> Mock:
-    """Create mock Claude response requesting tool use."""
-    tool_block = Mock()
-    tool_block.type = "tool_use"
-    tool_block.name = tool_name
-    tool_block.input = tool_input
-    tool_block.id = tool_id
-
-    response = Mock()
-    response.stop_reason = "tool_use"
-    response.content = [tool_block]
-
-    return response
-
-
-def build_claude_mixed_response(
-    text: str, tool_name: str, tool_input: dict[str, Any], tool_id: str = "tool_123"
-) -> Mock:
-    """Create mock Claude response with both text and tool use."""
-    text_block = Mock()
-    text_block.type = "text"
-    text_block.text = text
-
-    tool_block = Mock()
-    tool_block.type = "tool_use"
-    tool_block.name = tool_name
-    tool_block.input = tool_input
-    tool_block.id = tool_id
+@pytest.fixture(autouse=True)
+def clear_anthropic_client_cache():
+    """Drop cached Anthropic clients so per-test patches of the class apply."""
+    import ai_generator
 
-    response = Mock()
-    response.stop_reason = "tool_use"
-    response.content = [text_block, tool_block]
-
-    return response
+    ai_generator._CLIENT_CACHE.clear()
+    yield
+    ai_generator._CLIENT_CACHE.clear()
 
 
 # =============================================================================
@@ -111,276 +41,241 @@ def build_claude_mixed_response(
 # =============================================================================
 
 
-@pytest.fixture
-def sample_course():
-    """Sample Course object for testing."""
-    return Course(
-        title="Introduction to Machine Learning",
-        course_link="https://example.com/ml-course",
-        instructor="Dr. Smith",
-        lessons=[
-            Lesson(
-                lesson_number=0,
-                title="Introduction",
-                lesson_link="https://example.com/ml/0",
-            ),
-            Lesson(
-                lesson_number=1,
-                title="Supervised Learning",
-                lesson_link="https://example.com/ml/1",
-            ),
-            Lesson(
-                lesson_number=2,
-                title="Neural Networks",
-                lesson_link="https://example.com/ml/2",
-            ),
-        ],
-    )
-
-
-@pytest.fixture
-def sample_course_chunks(sample_course):
-    """Sample CourseChunk list for testing."""
-    return [
-        CourseChunk(
-            content="This is content about machine learning basics.",
-            course_title=sample_course.title,
-            lesson_number=0,
-            chunk_index=0,
-        ),
-        CourseChunk(
-            content="Supervised learning involves labeled data.",
-            course_title=sample_course.title,
-            lesson_number=1,
-            chunk_index=1,
-        ),
-        CourseChunk(
-            content="Neural networks are inspired by the brain.",
-            course_title=sample_course.title,
-            lesson_number=2,
-            chunk_index=2,
-        ),
-    ]
-
-
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_search_metadata():
     """Sample metadata for search results."""
-    return [
+    return (
         {"course_title": "Introduction to ML", "lesson_number": 1, "chunk_index": 0},
         {"course_title": "Introduction to ML", "lesson_number": 2, "chunk_index": 1},
-    ]
+    )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_search_documents():
     """Sample document content for search results."""
-    return [
+    return (
         "This section covers neural networks and deep learning concepts.",
         "Machine learning algorithms can be categorized into supervised and unsupervised.",
-    ]
+    )
 
 
 # =============================================================================
-# Mock VectorStore Fixture
+# Shared SearchResults Fixtures
 # =============================================================================
 
 
-@pytest.fixture
-def mock_vector_store(sample_search_documents, sample_search_metadata):
-    """Mock VectorStore with configurable search results."""
-    mock_store = MagicMock()
-
-    # Default search behavior - returns sample results
-    default_results = build_search_results(
-        documents=sample_search_documents,
-        metadata=sample_search_metadata,
-        distances=[0.3, 0.5],
-    )
-    mock_store.search.return_value = default_results
-
-    # Default lesson link behavior
-    mock_store.get_lesson_link.return_value = "https://example.com/lesson/1"
-
-    # Default course outline behavior
-    mock_store.get_course_outline.return_value = {
-        "title": "Introduction to ML",
-        "course_link": "https://example.com/ml",
-        "lessons": [
-            {
-                "lesson_number": 0,
-                "lesson_title": "Introduction",
-                "lesson_link": "https://example.com/ml/0",
-            },
-            {
-                "lesson_number": 1,
-                "lesson_title": "Basics",
-                "lesson_link": "https://example.com/ml/1",
-            },
-        ],
-    }
+@pytest.fixture(scope="session")
+def empty_search_results():
+    """Error-free empty search results (never mutated, so shared per session)."""
+    return build_empty_search_results()
 
-    return mock_store
 
-
-@pytest.fixture
-def mock_vector_store_empty():
-    """Mock VectorStore that returns empty results."""
-    mock_store = MagicMock()
-    mock_store.search.return_value = build_search_results(
-        documents=[], metadata=[], distances=[]
+@pytest.fixture(scope="session")
+def two_course_search_results():
+    """Two results from different courses and lessons (shared per session)."""
+    return build_search_results(
+        documents=("First result content.", "Second result content."),
+        metadata=(
+            {"course_title": "Course A", "lesson_number": 1},
+            {"course_title": "Course B", "lesson_number": 2},
+        ),
+        distances=(0.3, 0.5),
     )
-    mock_store.get_lesson_link.return_value = None
-    mock_store.get_course_outline.return_value = None
-    return mock_store
 
 
-@pytest.fixture
-def mock_vector_store_error():
-    """Mock VectorStore that returns error results."""
-    mock_store = MagicMock()
-    mock_store.search.return_value = SearchResults.empty(
-        "Search error: connection failed"
+# =============================================================================
+# Shared Claude Response Fixtures
+# =============================================================================
+
+
+@pytest.fixture(scope="session")
+def claude_responses():
+    """Common read-only Claude responses, built once per session."""
+    return SimpleNamespace(
+        final_answer=build_claude_text_response("Final answer"),
+        search_tool_use=build_claude_tool_use_response(
+            tool_name="search_course_content",
+            tool_input={"query": "test"},
+            tool_id="tool_id",
+        ),
+        outline_tool_use=build_claude_tool_use_response(
+            tool_name="get_course_outline",
+            tool_input={"course_name": "ML Course"},
+            tool_id="tool_1",
+        ),
     )
-    return mock_store
 
 
 # =============================================================================
-# Mock Anthropic Client Fixture
+# Mock VectorStore Fixture
 # =============================================================================
+# Stubs are built once per module; the function-scoped fixtures hand them to
+# tests and restore their defaults afterwards.
+
+
+@pytest.fixture(scope="module")
+def _module_vector_store(sample_search_documents, sample_search_metadata):
+    """Module-wide stub VectorStore with sample results."""
+    # Default search results, lesson link and course outline
+    return VectorStoreStub(
+        search_result=build_search_results(
+            documents=sample_search_documents,
+            metadata=sample_search_metadata,
+            distances=(0.3, 0.5),
+        ),
+        lesson_link="https://example.com/lesson/1",
+        outline={
+            "title": "Introduction to ML",
+            "course_link": "https://example.com/ml",
+            "lessons": [
+                {
+                    "lesson_number": 0,
+                    "lesson_title": "Introduction",
+                    "lesson_link": "https://example.com/ml/0",
+                },
+                {
+                    "lesson_number": 1,
+                    "lesson_title": "Basics",
+                    "lesson_link": "https://example.com/ml/1",
+                },
+            ],
+        },
+    )
 
 
-@pytest.fixture
-def mock_anthropic_client():
-    """Mock Anthropic client with configurable responses."""
-    mock_client = MagicMock()
+@pytest.fixture(scope="module")
+def _module_vector_store_empty(empty_search_results):
+    """Module-wide stub VectorStore that returns empty results."""
+    return VectorStoreStub(search_result=empty_search_results)
 
-    # Default behavior - returns direct text response
-    default_response = build_claude_text_response("This is a helpful response.")
-    mock_client.messages.create.return_value = default_response
 
-    return mock_client
+@pytest.fixture(scope="module")
+def _module_vector_store_error():
+    """Module-wide stub VectorStore that returns error results."""
+    return VectorStoreStub(
+        search_result=SearchResults.empty("Search error: connection failed")
+    )
 
 
 @pytest.fixture
-def mock_anthropic_client_tool_use():
-    """Mock Anthropic client that triggers tool use then returns final response."""
-    mock_client = MagicMock()
-
-    # First call triggers tool use
-    tool_response = build_claude_tool_use_response(
-        tool_name="search_course_content",
-        tool_input={"query": "neural networks"},
-        tool_id="tool_abc123",
-    )
+def mock_vector_store(_module_vector_store):
+    """Stub VectorStore with configurable search results."""
+    yield _module_vector_store
+    _module_vector_store.reset()
 
-    # Second call (after tool execution) returns final text
-    final_response = build_claude_text_response(
-        "Based on the course content, neural networks are a key topic covered in the ML course."
-    )
 
-    mock_client.messages.create.side_effect = [tool_response, final_response]
+@pytest.fixture
+def mock_vector_store_empty(_module_vector_store_empty):
+    """Stub VectorStore that returns empty results."""
+    yield _module_vector_store_empty
+    _module_vector_store_empty.reset()
 
-    return mock_client
+
+@pytest.fixture
+def mock_vector_store_error(_module_vector_store_error):
+    """Stub VectorStore that returns error results."""
+    yield _module_vector_store_error
+    _module_vector_store_error.reset()
 
 
 # =============================================================================
-# Mock Config Fixture
+# Mock Anthropic Client Fixture
 # =============================================================================
 
 
 @pytest.fixture
-def mock_config():
-    """Test configuration with dummy values."""
-    config = MagicMock()
-    config.ANTHROPIC_API_KEY = "test-api-key"
-    config.ANTHROPIC_MODEL = "claude-sonnet-4-20250514"
-    config.EMBEDDING_MODEL = "all-MiniLM-L6-v2"
-    config.CHUNK_SIZE = 800
-    config.CHUNK_OVERLAP = 100
-    config.MAX_RESULTS = 5
-    config.MAX_HISTORY = 2
-    config.CHROMA_PATH = "./test_chroma_db"
-    return config
+def patched_anthropic():
+    """Patch anthropic.Anthropic for AIGenerator and yield the client it returns."""
+    with patch("ai_generator.anthropic.Anthropic") as mock_anthropic_class:
+        client = AnthropicClientStub()
+        mock_anthropic_class.return_value = client
+        yield client
 
 
 # =============================================================================
-# Tool Manager Fixtures
+# Mock Config Fixture
 # =============================================================================
 
 
-@pytest.fixture
-def mock_tool_manager():
-    """Mock ToolManager for testing."""
-    mock_tm = MagicMock()
-    mock_tm.get_tool_definitions.return_value = [
-        {
-            "name": "search_course_content",
-            "description": "Search course materials",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string"},
-                    "course_name": {"type": "string"},
-                    "lesson_number": {"type": "integer"},
-                },
-                "required": ["query"],
-            },
-        }
-    ]
-    mock_tm.execute_tool.return_value = (
-        "[Introduction to ML - Lesson 1]\nThis is about neural networks."
+@pytest.fixture(scope="module")
+def mock_config():
+    """Plain config object with test values (read-only, so shared per module)."""
+    return SimpleNamespace(
+        ANTHROPIC_API_KEY="test-key",
+        ANTHROPIC_MODEL="test-model",
+        EMBEDDING_MODEL="test-model",
+        CHUNK_SIZE=800,
+        CHUNK_OVERLAP=100,
+        MAX_RESULTS=5,
+        MAX_HISTORY=2,
+        CHROMA_PATH="./test_chroma",
+        RESPONSE_CACHE_SIZE=100,
+        RESPONSE_CACHE_SIMILARITY=0.92,
     )
-    mock_tm.get_last_sources.return_value = [
-        {"title": "Introduction to ML", "lesson": 1, "url": "https://example.com/ml/1"}
-    ]
-    mock_tm.reset_sources.return_value = None
-    return mock_tm
 
 
 # =============================================================================
-# Session Manager Fixtures
+# Tool Manager Fixtures
 # =============================================================================
 
 
+@pytest.fixture(scope="session")
+def course_search_tool_definition():
+    """Real CourseSearchTool schema; static and read-only, so built once."""
+    return MappingProxyType(CourseSearchTool(VectorStoreStub()).get_tool_definition())
+
+
 @pytest.fixture
-def mock_session_manager():
-    """Mock SessionManager for testing."""
-    mock_sm = MagicMock()
-    mock_sm.create_session.return_value = "session_1"
-    mock_sm.get_conversation_history.return_value = "User: Hello\nAssistant: Hi there!"
-    mock_sm.add_exchange.return_value = None
-    return mock_sm
+def mock_tool_manager():
+    """ToolManager double that only accepts the real ToolManager API."""
+    return create_autospec(ToolManager, instance=True)
 
 
 # =============================================================================
 # API Test Fixtures
 # =============================================================================
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_rag_system():
-    """Mock RAGSystem for API testing."""
-    mock_rag = MagicMock()
+    """Mock RAGSystem for API testing (shared per module; reset between tests)."""
+    mock_rag = create_autospec(RAGSystem, instance=True)
     mock_rag.query.return_value = (
         "This is a test response about course content.",
         [{"title": "Test Course", "lesson": 1, "url": "https://example.com/lesson/1"}]
     )
+    mock_rag.aquery.return_value = mock_rag.query.return_value
+    mock_rag.query_stream.side_effect = lambda query, session_id: iter(
+        [
+            {"type": "text", "text": "This is a test "},
+            {"type": "text", "text": "response about course content."},
+            {"type": "done", "sources": mock_rag.query.return_value[1]},
+        ]
+    )
     mock_rag.get_course_analytics.return_value = {
         "total_courses": 3,
         "course_titles": ["Course A", "Course B", "Course C"]
     }
-    mock_rag.session_manager = MagicMock()
+    # Set in RAGSystem.__init__, so autospec cannot see it on the class
+    mock_rag.session_manager = Mock(spec=SessionManager)
     mock_rag.session_manager.create_session.return_value = "test_session_123"
     return mock_rag
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_rag_system_error():
-    """Mock RAGSystem that raises errors for error handling tests."""
-    mock_rag = MagicMock()
+    """Mock RAGSystem that raises errors (shared per module; reset between tests)."""
+    mock_rag = create_autospec(RAGSystem, instance=True)
     mock_rag.query.side_effect = Exception("Internal RAG system error")
+    mock_rag.aquery.side_effect = mock_rag.query.side_effect
     mock_rag.get_course_analytics.side_effect = Exception("Failed to get analytics")
-    mock_rag.session_manager = MagicMock()
+
+    def failing_stream(query, session_id):
+        yield {"type": "text", "text": "Partial"}
+        raise Exception("Stream failed")
+
+    mock_rag.query_stream.side_effect = failing_stream
+    # Set in RAGSystem.__init__, so autospec cannot see it on the class
+    mock_rag.session_manager = Mock(spec=SessionManager)
     mock_rag.session_manager.create_session.return_value = "test_session_123"
     return mock_rag
 
@@ -1,41 +1,83 @@
 """
 Helper functions for building mock objects in tests.
-These can be imported directly unlike conftest.py fixtures.
+These can be imported directly unlike conftest.py fixtures, which also
+imports them; backend/ and backend/tests/ are on pytest's pythonpath.
 """
 
-import sys
-from pathlib import Path
+from collections import deque
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+from types import SimpleNamespace
 from typing import Any
-from unittest.mock import Mock
-
-# Add backend to path for imports
-backend_path = Path(__file__).parent.parent
-sys.path.insert(0, str(backend_path))
+from unittest.mock import MagicMock, Mock
 
 from vector_store import SearchResults
 
 
+@lru_cache(maxsize=32)
+def _default_distances(count: int) -> tuple[float, ...]:
+    """Shared, immutable default distances for a result set of a given size."""
+    return (0.5,) * count
+
+
 def build_search_results(
-    documents: list[str],
-    metadata: list[dict[str, Any]],
-    distances: list[float] | None = None,
+    documents: Sequence[str],
+    metadata: Sequence[dict[str, Any]],
+    distances: Sequence[float] | None = None,
     error: str | None = None,
 ) -> SearchResults:
-    """Create SearchResults for testing."""
+    """Create SearchResults for testing; pass tuples for results shared across tests."""
     if distances is None:
-        distances = [0.5] * len(documents)
+        distances = _default_distances(len(documents))
     return SearchResults(
         documents=documents, metadata=metadata, distances=distances, error=error
     )
 
 
+# Shared error-free empty result; tuples keep callers from mutating it
+_EMPTY_SEARCH_RESULTS = SearchResults(documents=(), metadata=(), distances=())
+
+
 def build_empty_search_results(error_msg: str = None) -> SearchResults:
-    """Create empty SearchResults."""
-    return (
-        SearchResults.empty(error_msg)
-        if error_msg
-        else SearchResults(documents=[], metadata=[], distances=[])
-    )
+    """Create empty SearchResults (a shared instance when there is no error)."""
+    if error_msg:
+        return SearchResults.empty(error_msg)
+    return _EMPTY_SEARCH_RESULTS
+
+
+class VectorStoreStub:
+    """Minimal VectorStore stand-in exposing only what the course tools call."""
+
+    def __init__(
+        self,
+        search_result: SearchResults | None = None,
+        lesson_link: str | None = None,
+        outline: dict[str, Any] | None = None,
+    ):
+        self._defaults = (search_result, lesson_link, outline)
+        self.search = Mock(return_value=search_result)
+        self.get_lesson_link = Mock(return_value=lesson_link)
+        self.get_course_outline = Mock(return_value=outline)
+
+    def reset(self):
+        """Clear recorded calls and restore the constructor's return values."""
+        for method, default in zip(
+            (self.search, self.get_lesson_link, self.get_course_outline),
+            self._defaults,
+            strict=True,
+        ):
+            method.reset_mock(return_value=True, side_effect=True)
+            method.return_value = default
+
+
+class AnthropicClientStub:
+    """Minimal Anthropic client stand-in exposing only the Messages API calls."""
+
+    def __init__(self):
+        self.messages = SimpleNamespace(create=Mock(), stream=Mock())
+        self.beta = SimpleNamespace(
+            messages=SimpleNamespace(create=Mock(), stream=Mock())
+        )
 
 
 def build_chroma_results(
@@ -45,56 +87,98 @@ def build_chroma_results(
 ) -> dict:
     """Build mock ChromaDB query results format."""
     if distances is None:
-        distances = [0.5] * len(documents)
+        distances = _default_distances(len(documents))
     return {"documents": [documents], "metadatas": [metadata], "distances": [distances]}
 
 
-def build_claude_text_response(text: str) -> Mock:
-    """Create mock Claude response with text content (no tool use)."""
-    text_block = Mock()
-    text_block.type = "text"
-    text_block.text = text
+def _text_block(text: str) -> SimpleNamespace:
+    """Plain text content block."""
+    return SimpleNamespace(type="text", text=text)
+
+
+def _tool_use_block(
+    tool_name: str, tool_input: dict[str, Any], tool_id: str
+) -> SimpleNamespace:
+    """Plain tool_use content block."""
+    return SimpleNamespace(
+        type="tool_use", name=tool_name, input=tool_input, id=tool_id
+    )
 
-    response = Mock()
-    response.stop_reason = "end_turn"
-    response.content = [text_block]
 
-    return response
+def _claude_response(stop_reason: str, content: list) -> SimpleNamespace:
+    """Plain Message-shaped response with zeroed usage counters."""
+    return SimpleNamespace(
+        stop_reason=stop_reason,
+        content=content,
+        usage=SimpleNamespace(
+            input_tokens=0,
+            output_tokens=0,
+            cache_creation_input_tokens=None,
+            cache_read_input_tokens=None,
+        ),
+    )
+
+
+def build_claude_text_response(text: str) -> SimpleNamespace:
+    """Create Claude response with text content (no tool use)."""
+    return _claude_response("end_turn", [_text_block(text)])
 
 
 def build_claude_tool_use_response(
     tool_name: str, tool_input: dict[str, Any], tool_id: str = "tool_123"
-) -> Mock:
-    """Create mock Claude response requesting tool use."""
-    tool_block = Mock()
-    tool_block.type = "tool_use"
-    tool_block.name = tool_name
-    tool_block.input = tool_input
-    tool_block.id = tool_id
+) -> SimpleNamespace:
+    """Create Claude response requesting tool use."""
+    return _claude_response(
+        "tool_use", [_tool_use_block(tool_name, tool_input, tool_id)]
+    )
 
-    response = Mock()
-    response.stop_reason = "tool_use"
-    response.content = [tool_block]
 
-    return response
+def build_claude_multi_tool_use_response(
+    tool_calls: list[tuple[str, dict[str, Any], str]],
+) -> SimpleNamespace:
+    """Create Claude response requesting several tools in one turn."""
+    return _claude_response(
+        "tool_use",
+        [
+            _tool_use_block(tool_name, tool_input, tool_id)
+            for tool_name, tool_input, tool_id in tool_calls
+        ],
+    )
 
 
 def build_claude_mixed_response(
     text: str, tool_name: str, tool_input: dict[str, Any], tool_id: str = "tool_123"
-) -> Mock:
-    """Create mock Claude response with both text and tool use."""
-    text_block = Mock()
-    text_block.type = "text"
-    text_block.text = text
-
-    tool_block = Mock()
-    tool_block.type = "tool_use"
-    tool_block.name = tool_name
-    tool_block.input = tool_input
-    tool_block.id = tool_id
-
-    response = Mock()
-    response.stop_reason = "tool_use"
-    response.content = [text_block, tool_block]
-
-    return response
+) -> SimpleNamespace:
+    """Create Claude response with both text and tool use."""
+    return _claude_response(
+        "tool_use",
+        [_text_block(text), _tool_use_block(tool_name, tool_input, tool_id)],
+    )
+
+
+def scripted_responses(*responses: SimpleNamespace) -> Callable[..., SimpleNamespace]:
+    """
+    Side effect for messages.create that returns responses in order and
+    fails with a clear message if Claude is called more times than scripted.
+    """
+    pending = deque(responses)
+
+    def create(**kwargs):
+        if not pending:
+            raise AssertionError("unexpected extra messages.create call")
+        return pending.popleft()
+
+    return create
+
+
+def build_claude_stream(
+    chunks: list[str], final_response: SimpleNamespace
+) -> MagicMock:
+    """Create mock messages.stream() context manager yielding text chunks."""
+    stream = Mock()
+    stream.text_stream = iter(chunks)
+    stream.get_final_message.return_value = final_response
+
+    stream_manager = MagicMock()
+    stream_manager.__enter__.return_value = stream
+    return stream_manager
@@ -0,0 +1,47 @@
+"""
+Shared fixtures for integration tests wiring real tools to a mocked VectorStore.
+"""
+
+import pytest
+from ai_generator import AIGenerator
+from helpers import VectorStoreStub
+from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
+
+
+@pytest.fixture
+def mock_vs():
+    """Stub VectorStore; tests configure the return values they need."""
+    return VectorStoreStub()
+
+
+@pytest.fixture
+def search_tool(mock_vs):
+    """Real CourseSearchTool backed by the mock VectorStore."""
+    return CourseSearchTool(mock_vs)
+
+
+@pytest.fixture
+def outline_tool(mock_vs):
+    """Real CourseOutlineTool backed by the mock VectorStore."""
+    return CourseOutlineTool(mock_vs)
+
+
+@pytest.fixture(scope="module")
+def search_tool_defs(course_search_tool_definition):
+    """Search tool schema list for generate_response."""
+    return [course_search_tool_definition]
+
+
+@pytest.fixture
+def ai_generator(patched_anthropic):
+    """AIGenerator whose Anthropic client is the patched_anthropic mock."""
+    return AIGenerator(api_key="test", model="test")
+
+
+@pytest.fixture
+def tool_manager(search_tool, outline_tool):
+    """ToolManager with both course tools registered."""
+    manager = ToolManager()
+    manager.register_tool(search_tool)
+    manager.register_tool(outline_tool)
+    return manager
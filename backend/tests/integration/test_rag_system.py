@@ -8,175 +8,174 @@ Tests evaluate:
 4. Conversation history management
 """
 
-import sys
-from pathlib import Path
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest.mock import DEFAULT, AsyncMock, Mock, call, patch
 
 import pytest
 
-# Add backend to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+# Patches target rag_system's module attributes, so importing the class
+# once here does not bypass them
+import rag_system
+from helpers import VectorStoreStub, build_search_results
+from rag_system import RAGSystem
+from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
+
+# RAGSystem collaborators, patched together via patch.multiple(rag_system, ...)
+RAG_COMPONENTS = dict.fromkeys(
+    [
+        "DocumentProcessor",
+        "VectorStore",
+        "AIGenerator",
+        "SessionManager",
+        "ToolManager",
+        "CourseSearchTool",
+        "CourseOutlineTool",
+    ],
+    DEFAULT,
+)
+
+# Collaborators built once in RAGSystem.__init__; tools are built per query
+CORE_COMPONENTS = ["DocumentProcessor", "VectorStore", "AIGenerator", "SessionManager"]
+
+# Inputs for the shared query whose generate_response kwargs are checked
+QUERY_HISTORY = "User: Hello\nAssistant: Hi!"
+QUERY_TOOL_DEFS = [{"name": "search", "description": "Search tool", "input_schema": {}}]
+
+
+@pytest.fixture(scope="module")
+def rag_components():
+    """Patch all RAGSystem collaborator classes once per module."""
+    with patch.multiple(rag_system, **RAG_COMPONENTS) as mocks:
+        yield mocks
+
+
+@pytest.fixture(scope="module")
+def mock_dependencies(rag_components):
+    """Instance mocks returned by the patched collaborator classes."""
+    # Each patched class already returns a single auto-created instance
+    # mock; hand those out instead of building replacement MagicMocks.
+    # Default behaviors are applied by reset_mocks before each query test.
+    return {
+        "document_processor": rag_components["DocumentProcessor"].return_value,
+        "vector_store": rag_components["VectorStore"].return_value,
+        "ai_generator": rag_components["AIGenerator"].return_value,
+        "session_manager": rag_components["SessionManager"].return_value,
+        "tool_manager": rag_components["ToolManager"].return_value,
+        "search_tool": rag_components["CourseSearchTool"].return_value,
+        "outline_tool": rag_components["CourseOutlineTool"].return_value,
+    }
+
+
+@pytest.fixture(scope="module")
+def rag(rag_components, mock_config):
+    """RAGSystem built once against the module's patched collaborators."""
+    return RAGSystem(mock_config)
 
 
 class TestRAGSystemQuery:
     """Tests for RAGSystem.query() method."""
 
-    @pytest.fixture
-    def mock_dependencies(self):
-        """Create all mocked dependencies for RAGSystem."""
-        with (
-            patch("rag_system.DocumentProcessor") as mock_dp,
-            patch("rag_system.VectorStore") as mock_vs,
-            patch("rag_system.AIGenerator") as mock_ai,
-            patch("rag_system.SessionManager") as mock_sm,
-            patch("rag_system.ToolManager") as mock_tm,
-            patch("rag_system.CourseSearchTool") as mock_cst,
-            patch("rag_system.CourseOutlineTool") as mock_cot,
-        ):
+    @pytest.fixture(autouse=True)
+    def reset_mocks(self, mock_dependencies):
+        """Clear calls and per-test configuration, then restore default behaviors."""
+        for mock in mock_dependencies.values():
+            mock.reset_mock(return_value=True, side_effect=True)
 
-            # Setup mock instances
-            mock_dp_instance = MagicMock()
-            mock_vs_instance = MagicMock()
-            mock_ai_instance = MagicMock()
-            mock_sm_instance = MagicMock()
-            mock_tm_instance = MagicMock()
-            mock_cst_instance = MagicMock()
-            mock_cot_instance = MagicMock()
-
-            mock_dp.return_value = mock_dp_instance
-            mock_vs.return_value = mock_vs_instance
-            mock_ai.return_value = mock_ai_instance
-            mock_sm.return_value = mock_sm_instance
-            mock_tm.return_value = mock_tm_instance
-            mock_cst.return_value = mock_cst_instance
-            mock_cot.return_value = mock_cot_instance
-
-            # Default behaviors
-            mock_ai_instance.generate_response.return_value = "AI response"
-            mock_sm_instance.get_conversation_history.return_value = None
-            mock_tm_instance.get_tool_definitions.return_value = []
-            mock_tm_instance.get_last_sources.return_value = []
-
-            yield {
-                "document_processor": mock_dp_instance,
-                "vector_store": mock_vs_instance,
-                "ai_generator": mock_ai_instance,
-                "session_manager": mock_sm_instance,
-                "tool_manager": mock_tm_instance,
-                "search_tool": mock_cst_instance,
-                "outline_tool": mock_cot_instance,
-            }
+        mock_dependencies["ai_generator"].generate_response.return_value = "AI response"
+        mock_dependencies["session_manager"].get_conversation_history.return_value = (
+            None
+        )
+        mock_dependencies["tool_manager"].get_tool_definitions.return_value = []
+        mock_dependencies["tool_manager"].get_last_sources.return_value = []
 
-    @pytest.fixture
-    def mock_config(self):
-        """Create mock config."""
-        config = MagicMock()
-        config.CHUNK_SIZE = 800
-        config.CHUNK_OVERLAP = 100
-        config.CHROMA_PATH = "./test_chroma"
-        config.EMBEDDING_MODEL = "test-model"
-        config.ANTHROPIC_API_KEY = "test-key"
-        config.ANTHROPIC_MODEL = "test-model"
-        config.MAX_RESULTS = 5
-        config.MAX_HISTORY = 2
-        return config
-
-    def test_query_retrieves_history_for_session(self, mock_dependencies, mock_config):
+    def test_query_retrieves_history_for_session(self, rag, mock_dependencies):
         """Verify session history is retrieved when session_id provided."""
-        from rag_system import RAGSystem
-
         mock_dependencies["session_manager"].get_conversation_history.return_value = (
             "User: Previous\nAssistant: Reply"
         )
 
-        rag = RAGSystem(mock_config)
         rag.query("New question", session_id="session_123")
 
         mock_dependencies[
             "session_manager"
         ].get_conversation_history.assert_called_with("session_123")
 
-    def test_query_passes_history_to_ai_generator(self, mock_dependencies, mock_config):
-        """Verify conversation history is passed to AI generator."""
-        from rag_system import RAGSystem
-
-        history = "User: Hello\nAssistant: Hi!"
+    @pytest.fixture(scope="class")
+    def generate_kwargs(self, rag, mock_dependencies):
+        """Run one query with history and tools; capture generate_response kwargs."""
         mock_dependencies["session_manager"].get_conversation_history.return_value = (
-            history
+            QUERY_HISTORY
+        )
+        mock_dependencies["tool_manager"].get_tool_definitions.return_value = (
+            QUERY_TOOL_DEFS
         )
 
-        rag = RAGSystem(mock_config)
-        rag.query("Follow up", session_id="session_1")
-
-        call_kwargs = mock_dependencies[
-            "ai_generator"
-        ].generate_response.call_args.kwargs
-        assert call_kwargs["conversation_history"] == history
-
-    def test_query_passes_tools_to_ai_generator(self, mock_dependencies, mock_config):
-        """Verify tool definitions are passed to AI generator."""
-        from rag_system import RAGSystem
-
-        tool_defs = [
-            {"name": "search", "description": "Search tool", "input_schema": {}}
-        ]
-        mock_dependencies["tool_manager"].get_tool_definitions.return_value = tool_defs
-
-        rag = RAGSystem(mock_config)
-        rag.query("Test query")
-
-        call_kwargs = mock_dependencies[
-            "ai_generator"
-        ].generate_response.call_args.kwargs
-        assert call_kwargs["tools"] == tool_defs
-
-    def test_query_passes_tool_manager_to_ai_generator(
-        self, mock_dependencies, mock_config
-    ):
-        """Verify tool manager is passed for execution."""
-        from rag_system import RAGSystem
-
-        rag = RAGSystem(mock_config)
-        rag.query("Test query")
+        rag.query("What is Python?", session_id="session_1")
 
-        call_kwargs = mock_dependencies[
-            "ai_generator"
-        ].generate_response.call_args.kwargs
-        assert "tool_manager" in call_kwargs
+        return dict(
+            mock_dependencies["ai_generator"].generate_response.call_args.kwargs
+        )
 
-    def test_query_retrieves_sources_after_generation(
-        self, mock_dependencies, mock_config
-    ):
+    @pytest.mark.parametrize(
+        "key, check",
+        [
+            ("conversation_history", lambda value, rag: value == QUERY_HISTORY),
+            ("tools", lambda value, rag: value == QUERY_TOOL_DEFS),
+            (
+                "tool_manager",
+                lambda value, rag: value is rag_system.ToolManager.return_value,
+            ),
+            # The raw question is used for semantic response-cache matching
+            ("semantic_query", lambda value, rag: value == "What is Python?"),
+            # The prompt wraps the user query
+            (
+                "query",
+                lambda value, rag: "What is Python?" in value
+                and "course materials" in value.lower(),
+            ),
+        ],
+        ids=["history", "tools", "tool_manager", "semantic_query", "prompt_wrapper"],
+    )
+    def test_query_passes_to_ai_generator(self, rag, generate_kwargs, key, check):
+        """Verify history, tools, tool manager and wrapped query reach the generator."""
+        assert check(generate_kwargs[key], rag)
+
+    def test_query_retrieves_sources_after_generation(self, rag, mock_dependencies):
         """Verify sources are retrieved from tool manager."""
-        from rag_system import RAGSystem
-
         expected_sources = [{"title": "Course", "lesson": 1, "url": "http://test"}]
         mock_dependencies["tool_manager"].get_last_sources.return_value = (
             expected_sources
         )
 
-        rag = RAGSystem(mock_config)
         response, sources = rag.query("Test query")
 
         mock_dependencies["tool_manager"].get_last_sources.assert_called_once()
         assert sources == expected_sources
 
-    def test_query_resets_sources_after_retrieval(self, mock_dependencies, mock_config):
-        """Verify sources are reset after being retrieved."""
-        from rag_system import RAGSystem
+    def test_each_query_builds_its_own_tool_manager(self, rag, rag_components):
+        """Verify every query gets a fresh ToolManager, so sources never leak."""
+        created_before = rag_components["ToolManager"].call_count
+
+        rag.query("First query")
+        rag.query("Second query")
 
-        rag = RAGSystem(mock_config)
+        assert rag_components["ToolManager"].call_count == created_before + 2
+
+    def test_query_registers_both_tools(self, rag, mock_dependencies):
+        """Verify search and outline tools over the vector store are registered."""
         rag.query("Test query")
 
-        mock_dependencies["tool_manager"].reset_sources.assert_called_once()
+        assert mock_dependencies["tool_manager"].register_tool.call_args_list == [
+            call(mock_dependencies["search_tool"]),
+            call(mock_dependencies["outline_tool"]),
+        ]
+        rag_system.CourseSearchTool.assert_called_with(rag.vector_store)
+        rag_system.CourseOutlineTool.assert_called_with(rag.vector_store)
 
-    def test_query_updates_conversation_history(self, mock_dependencies, mock_config):
+    def test_query_updates_conversation_history(self, rag, mock_dependencies):
         """Verify conversation history is updated after query."""
-        from rag_system import RAGSystem
-
         mock_dependencies["ai_generator"].generate_response.return_value = "AI answer"
 
-        rag = RAGSystem(mock_config)
         rag.query("User question", session_id="session_1")
 
         mock_dependencies["session_manager"].add_exchange.assert_called_with(
@@ -184,123 +183,153 @@ class TestRAGSystemQuery:
         )
 
     def test_query_does_not_update_history_without_session(
-        self, mock_dependencies, mock_config
+        self, rag, mock_dependencies
     ):
         """Verify history not updated when no session_id."""
-        from rag_system import RAGSystem
-
-        rag = RAGSystem(mock_config)
         rag.query("Question", session_id=None)
 
         mock_dependencies["session_manager"].add_exchange.assert_not_called()
 
-    def test_query_returns_response_and_sources(self, mock_dependencies, mock_config):
+    def test_query_returns_response_and_sources(self, rag, mock_dependencies):
         """Verify query returns tuple of (response, sources)."""
-        from rag_system import RAGSystem
-
         mock_dependencies["ai_generator"].generate_response.return_value = "The answer"
         mock_dependencies["tool_manager"].get_last_sources.return_value = [
             {"title": "ML Course", "lesson": 1, "url": "http://ml.com/1"}
         ]
 
-        rag = RAGSystem(mock_config)
         response, sources = rag.query("What is ML?")
 
         assert response == "The answer"
         assert len(sources) == 1
         assert sources[0]["title"] == "ML Course"
 
-    def test_query_returns_empty_sources_when_none(
-        self, mock_dependencies, mock_config
-    ):
+    def test_query_returns_empty_sources_when_none(self, rag, mock_dependencies):
         """Verify empty list returned when no sources."""
-        from rag_system import RAGSystem
-
         mock_dependencies["tool_manager"].get_last_sources.return_value = []
 
-        rag = RAGSystem(mock_config)
         response, sources = rag.query("General question")
 
         assert sources == []
 
-    def test_query_includes_prompt_wrapper(self, mock_dependencies, mock_config):
-        """Verify query is wrapped in prompt template."""
-        from rag_system import RAGSystem
+    async def test_aquery_uses_async_generation(self, rag, mock_dependencies):
+        """Verify aquery awaits the async generator and updates history."""
+        expected_sources = [{"title": "Course", "lesson": 1, "url": "http://test"}]
+        mock_dependencies["tool_manager"].get_last_sources.return_value = (
+            expected_sources
+        )
+
+        # The generator mock is shared module-wide, so patch only for this test
+        with patch.object(
+            mock_dependencies["ai_generator"],
+            "agenerate_response",
+            new_callable=AsyncMock,
+            return_value="Async answer",
+        ):
+            response, sources = await rag.aquery("Question", session_id="session_1")
+
+        assert response == "Async answer"
+        assert sources == expected_sources
+        mock_dependencies["ai_generator"].generate_response.assert_not_called()
+        mock_dependencies["session_manager"].add_exchange.assert_called_with(
+            "session_1", "Question", "Async answer"
+        )
 
-        rag = RAGSystem(mock_config)
-        rag.query("What is Python?")
+    def test_query_stream_yields_text_then_done(self, rag, mock_dependencies):
+        """Verify streamed query yields text events, sources, and saves the answer."""
 
-        call_kwargs = mock_dependencies[
-            "ai_generator"
-        ].generate_response.call_args.kwargs
-        query = call_kwargs["query"]
+        def stream_with_tool_preamble(**kwargs):
+            yield {"type": "status", "text": "Let me search."}
+            yield {"type": "text", "text": "Streamed answer"}
+            return "Streamed answer"
 
-        # The prompt wraps the user query
-        assert "What is Python?" in query
-        assert "course materials" in query.lower()
+        mock_dependencies["ai_generator"].generate_response_stream.side_effect = (
+            stream_with_tool_preamble
+        )
+        expected_sources = [{"title": "Course", "lesson": 1, "url": "http://test"}]
+        mock_dependencies["tool_manager"].get_last_sources.return_value = (
+            expected_sources
+        )
+
+        events = list(rag.query_stream("Question", session_id="session_1"))
+
+        # Status text is passed through, but only the final answer is saved
+        assert events == [
+            {"type": "status", "text": "Let me search."},
+            {"type": "text", "text": "Streamed answer"},
+            {"type": "done", "sources": expected_sources},
+        ]
+        mock_dependencies["session_manager"].add_exchange.assert_called_with(
+            "session_1", "Question", "Streamed answer"
+        )
 
 
 class TestRAGSystemInitialization:
     """Tests for RAGSystem initialization."""
 
-    def test_initialization_creates_all_components(self):
-        """Verify all components are created during init."""
-        with (
-            patch("rag_system.DocumentProcessor") as mock_dp,
-            patch("rag_system.VectorStore") as mock_vs,
-            patch("rag_system.AIGenerator") as mock_ai,
-            patch("rag_system.SessionManager") as mock_sm,
-            patch("rag_system.ToolManager") as mock_tm,
-            patch("rag_system.CourseSearchTool") as mock_cst,
-            patch("rag_system.CourseOutlineTool") as mock_cot,
-        ):
+    # Class mocks are never reset, so their calls reflect the one module-wide
+    # RAGSystem construction; instance calls appear as call().<method> there
+
+    def test_initialization_creates_all_components(self, rag, rag_components):
+        """Verify all core components are created during init."""
+        for name in CORE_COMPONENTS:
+            rag_components[name].assert_called_once()
+
+
+# Search results that name the topic a concurrent query searched for
+TOPIC_RESULTS = {
+    topic: build_search_results(
+        documents=[f"{topic} content"],
+        metadata=[{"course_title": f"{topic.title()} Course", "lesson_number": 1}],
+    )
+    for topic in ("alpha", "beta")
+}
+
 
-            from rag_system import RAGSystem
-
-            config = MagicMock()
-            config.CHUNK_SIZE = 800
-            config.CHUNK_OVERLAP = 100
-            config.CHROMA_PATH = "./test"
-            config.EMBEDDING_MODEL = "model"
-            config.ANTHROPIC_API_KEY = "key"
-            config.ANTHROPIC_MODEL = "model"
-            config.MAX_RESULTS = 5
-            config.MAX_HISTORY = 2
-
-            rag = RAGSystem(config)
-
-            mock_dp.assert_called_once()
-            mock_vs.assert_called_once()
-            mock_ai.assert_called_once()
-            mock_sm.assert_called_once()
-            mock_tm.assert_called_once()
-
-    def test_initialization_registers_both_tools(self):
-        """Verify both search and outline tools are registered."""
-        with (
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator"),
-            patch("rag_system.SessionManager"),
-            patch("rag_system.ToolManager") as mock_tm,
-            patch("rag_system.CourseSearchTool") as mock_cst,
-            patch("rag_system.CourseOutlineTool") as mock_cot,
+class TestRAGSystemConcurrentQueries:
+    """Tests for overlapping aquery calls against the real search tools."""
+
+    @pytest.fixture
+    def concurrent_rag(self, rag_components, mock_config):
+        """RAGSystem with real tools over a stub store keyed on the search query."""
+        store = VectorStoreStub(lesson_link="http://test/lesson")
+        store.search.side_effect = lambda query, **filters: TOPIC_RESULTS[query]
+        store.embedder = None
+
+        with patch.multiple(
+            rag_system,
+            VectorStore=Mock(return_value=store),
+            AIGenerator=DEFAULT,
+            ToolManager=ToolManager,
+            CourseSearchTool=CourseSearchTool,
+            CourseOutlineTool=CourseOutlineTool,
         ):
+            yield RAGSystem(mock_config)
 
-            from rag_system import RAGSystem
+    async def test_concurrent_aqueries_keep_their_own_sources(self, concurrent_rag):
+        """Verify two interleaved aquery calls each return their own sources."""
+        both_searched = asyncio.Barrier(2)
 
-            config = MagicMock()
-            config.CHUNK_SIZE = 800
-            config.CHUNK_OVERLAP = 100
-            config.CHROMA_PATH = "./test"
-            config.EMBEDDING_MODEL = "model"
-            config.ANTHROPIC_API_KEY = "key"
-            config.ANTHROPIC_MODEL = "model"
-            config.MAX_RESULTS = 5
-            config.MAX_HISTORY = 2
+        async def search_then_answer(query, tool_manager, **kwargs):
+            topic = query.rsplit(" ", 1)[-1]
+            tool_manager.execute_tool("search_course_content", query=topic)
+            # Neither request reads its sources until both have searched
+            await both_searched.wait()
+            return f"{topic} answer"
 
-            rag = RAGSystem(config)
+        concurrent_rag.ai_generator.agenerate_response = AsyncMock(
+            side_effect=search_then_answer
+        )
 
-            # Both tools should be registered
-            tm_instance = mock_tm.return_value
-            assert tm_instance.register_tool.call_count == 2
+        (alpha_answer, alpha_sources), (beta_answer, beta_sources) = (
+            await asyncio.gather(
+                concurrent_rag.aquery("alpha"), concurrent_rag.aquery("beta")
+            )
+        )
+
+        assert (alpha_answer, beta_answer) == ("alpha answer", "beta answer")
+        assert alpha_sources == [
+            {"title": "Alpha Course", "lesson": 1, "url": "http://test/lesson"}
+        ]
+        assert beta_sources == [
+            {"title": "Beta Course", "lesson": 1, "url": "http://test/lesson"}
+        ]
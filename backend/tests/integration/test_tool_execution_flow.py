@@ -8,53 +8,78 @@ Tests evaluate:
 4. Direct response path (no tool use)
 """
 
-import sys
-from pathlib import Path
-from unittest.mock import MagicMock, patch
-
-# Add backend and tests to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
+import pytest
 from helpers import (
+    VectorStoreStub,
     build_claude_text_response,
     build_claude_tool_use_response,
     build_search_results,
+    scripted_responses,
 )
 from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
 
+# Read-only search payloads, built once at import and shared across tests
+_ML_BASICS_RESULTS = build_search_results(
+    documents=("Neural networks are machine learning models.",),
+    metadata=({"course_title": "ML Basics", "lesson_number": 1},),
+)
+_ML_COURSE_RESULTS = build_search_results(
+    documents=("ML is a subset of AI.",),
+    metadata=({"course_title": "ML Course", "lesson_number": 1},),
+)
+_SINGLE_COURSE_RESULTS = build_search_results(
+    documents=("Content",),
+    metadata=({"course_title": "Course", "lesson_number": 1},),
+)
+_GENERIC_SEARCH_RESULTS = build_search_results(
+    documents=("Search result",),
+    metadata=({"course_title": "C", "lesson_number": 1},),
+)
+
 
 class TestSearchToolExecutionFlow:
     """Tests for complete search tool execution flow."""
 
-    def test_search_tool_triggered_for_course_question(self):
+    @pytest.mark.parametrize(
+        "exec_kwargs, expected_search_kwargs",
+        [
+            pytest.param(
+                {"query": "neural networks"},
+                {
+                    "query": "neural networks",
+                    "course_name": None,
+                    "lesson_number": None,
+                },
+                id="no_filter",
+            ),
+            pytest.param(
+                {"query": "basics", "course_name": "Python"},
+                {"query": "basics", "course_name": "Python", "lesson_number": None},
+                id="course_filter",
+            ),
+            pytest.param(
+                {"query": "test", "lesson_number": 3},
+                {"query": "test", "course_name": None, "lesson_number": 3},
+                id="lesson_filter",
+            ),
+        ],
+    )
+    def test_search_tool_flow(
+        self, mock_vs, tool_manager, exec_kwargs, expected_search_kwargs
+    ):
         """
-        Verify complete flow when Claude decides to use search_course_content.
+        Verify filters pass through the search flow and results are tracked.
 
         Flow: AIGenerator -> ToolManager -> CourseSearchTool -> VectorStore
         """
-        # Setup mock VectorStore
-        mock_vs = MagicMock()
-        mock_vs.search.return_value = build_search_results(
-            documents=["Neural networks are machine learning models."],
-            metadata=[{"course_title": "ML Basics", "lesson_number": 1}],
-        )
+        mock_vs.search.return_value = _ML_BASICS_RESULTS
         mock_vs.get_lesson_link.return_value = "https://example.com/ml/1"
 
-        # Setup ToolManager with real CourseSearchTool
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vs)
-        tool_manager.register_tool(search_tool)
-
         # Execute tool through manager (simulating what AIGenerator does)
-        result = tool_manager.execute_tool(
-            "search_course_content", query="neural networks"
-        )
+        result = tool_manager.execute_tool("search_course_content", **exec_kwargs)
 
-        # Verify VectorStore.search was called
-        mock_vs.search.assert_called_once_with(
-            query="neural networks", course_name=None, lesson_number=None
-        )
+        # Verify VectorStore.search received the query and filters
+        mock_vs.search.assert_called_once_with(**expected_search_kwargs)
 
         # Verify result is formatted correctly
         assert "[ML Basics - Lesson 1]" in result
@@ -66,55 +91,12 @@ class TestSearchToolExecutionFlow:
         assert sources[0]["title"] == "ML Basics"
         assert sources[0]["url"] == "https://example.com/ml/1"
 
-    def test_search_tool_with_course_filter(self):
-        """Verify course filter is passed through the flow."""
-        mock_vs = MagicMock()
-        mock_vs.search.return_value = build_search_results(
-            documents=["Python content here."],
-            metadata=[{"course_title": "Python 101", "lesson_number": 2}],
-        )
-        mock_vs.get_lesson_link.return_value = "https://example.com/py/2"
-
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vs)
-        tool_manager.register_tool(search_tool)
-
-        result = tool_manager.execute_tool(
-            "search_course_content", query="basics", course_name="Python"
-        )
-
-        # Verify course filter was passed
-        mock_vs.search.assert_called_once_with(
-            query="basics", course_name="Python", lesson_number=None
-        )
-
-    def test_search_tool_with_lesson_filter(self):
-        """Verify lesson filter is passed through the flow."""
-        mock_vs = MagicMock()
-        mock_vs.search.return_value = build_search_results(
-            documents=["Lesson 3 content."],
-            metadata=[{"course_title": "Course", "lesson_number": 3}],
-        )
-        mock_vs.get_lesson_link.return_value = "https://example.com/3"
-
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vs)
-        tool_manager.register_tool(search_tool)
-
-        tool_manager.execute_tool(
-            "search_course_content", query="test", lesson_number=3
-        )
-
-        call_kwargs = mock_vs.search.call_args.kwargs
-        assert call_kwargs["lesson_number"] == 3
-
 
 class TestOutlineToolExecutionFlow:
     """Tests for course outline tool execution flow."""
 
-    def test_outline_tool_returns_course_structure(self):
+    def test_outline_tool_returns_course_structure(self, mock_vs, tool_manager):
         """Verify outline tool retrieves and formats course structure."""
-        mock_vs = MagicMock()
         mock_vs.get_course_outline.return_value = {
             "title": "Machine Learning Course",
             "course_link": "https://example.com/ml",
@@ -132,10 +114,6 @@ class TestOutlineToolExecutionFlow:
             ],
         }
 
-        tool_manager = ToolManager()
-        outline_tool = CourseOutlineTool(mock_vs)
-        tool_manager.register_tool(outline_tool)
-
         result = tool_manager.execute_tool("get_course_outline", course_name="ML")
 
         mock_vs.get_course_outline.assert_called_once_with("ML")
@@ -143,15 +121,10 @@ class TestOutlineToolExecutionFlow:
         assert "Lesson 0: Introduction" in result
         assert "Lesson 1: Basics" in result
 
-    def test_outline_tool_handles_not_found(self):
+    def test_outline_tool_handles_not_found(self, mock_vs, tool_manager):
         """Verify outline tool handles course not found."""
-        mock_vs = MagicMock()
         mock_vs.get_course_outline.return_value = None
 
-        tool_manager = ToolManager()
-        outline_tool = CourseOutlineTool(mock_vs)
-        tool_manager.register_tool(outline_tool)
-
         result = tool_manager.execute_tool(
             "get_course_outline", course_name="NonExistent"
         )
@@ -160,16 +133,14 @@ class TestOutlineToolExecutionFlow:
         assert "NonExistent" in result
 
 
+@pytest.mark.slow
 class TestToolResultsToAI:
     """Tests for passing tool results back to Claude."""
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_tool_results_included_in_follow_up_call(self, mock_anthropic_class):
+    def test_tool_results_included_in_follow_up_call(
+        self, patched_anthropic, ai_generator, mock_vs, search_tool_defs, tool_manager
+    ):
         """Verify tool results are passed back to Claude for synthesis."""
-        from ai_generator import AIGenerator
-
-        mock_client = MagicMock()
-
         # First response: Claude wants to use search tool
         tool_response = build_claude_tool_use_response(
             tool_name="search_course_content",
@@ -182,42 +153,32 @@ class TestToolResultsToAI:
             "Based on the course materials, machine learning is..."
         )
 
-        mock_client.messages.create.side_effect = [tool_response, final_response]
-        mock_anthropic_class.return_value = mock_client
-
-        # Setup real tool manager with mock VectorStore
-        mock_vs = MagicMock()
-        mock_vs.search.return_value = build_search_results(
-            documents=["ML is a subset of AI."],
-            metadata=[{"course_title": "ML Course", "lesson_number": 1}],
+        patched_anthropic.messages.create.side_effect = scripted_responses(
+            tool_response, final_response
         )
-        mock_vs.get_lesson_link.return_value = "https://ml.com/1"
-
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vs)
-        tool_manager.register_tool(search_tool)
 
-        tools = [search_tool.get_tool_definition()]
+        mock_vs.search.return_value = _ML_COURSE_RESULTS
+        mock_vs.get_lesson_link.return_value = "https://ml.com/1"
 
-        generator = AIGenerator(api_key="test", model="test")
-        result = generator.generate_response(
-            query="What is ML?", tools=tools, tool_manager=tool_manager
+        result = ai_generator.generate_response(
+            query="What is ML?", tools=search_tool_defs, tool_manager=tool_manager
         )
 
         # Verify second API call includes tool result
-        second_call = mock_client.messages.create.call_args_list[1]
+        second_call = patched_anthropic.messages.create.call_args_list[1]
         messages = second_call.kwargs["messages"]
 
-        # Find tool_result message
-        tool_result_msg = None
-        for msg in messages:
-            if msg["role"] == "user":
-                content = msg.get("content", [])
-                if isinstance(content, list):
-                    for item in content:
-                        if isinstance(item, dict) and item.get("type") == "tool_result":
-                            tool_result_msg = item
-                            break
+        # Find tool_result block
+        tool_result_msg = next(
+            (
+                item
+                for msg in messages
+                if msg["role"] == "user" and isinstance(msg.get("content"), list)
+                for item in msg["content"]
+                if isinstance(item, dict) and item.get("type") == "tool_result"
+            ),
+            None,
+        )
 
         assert tool_result_msg is not None
         assert "ML Course" in tool_result_msg["content"]
@@ -226,34 +187,24 @@ class TestToolResultsToAI:
         assert "machine learning" in result.lower()
 
 
+@pytest.mark.slow
 class TestNoToolUsePath:
     """Tests for direct response path (no tool use)."""
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_direct_response_without_tool_use(self, mock_anthropic_class):
+    def test_direct_response_without_tool_use(
+        self, patched_anthropic, ai_generator, mock_vs, search_tool_defs, tool_manager
+    ):
         """Verify direct response when Claude doesn't use tools."""
-        from ai_generator import AIGenerator
-
-        mock_client = MagicMock()
-        mock_client.messages.create.return_value = build_claude_text_response(
+        patched_anthropic.messages.create.return_value = build_claude_text_response(
             "Python is a programming language."
         )
-        mock_anthropic_class.return_value = mock_client
-
-        mock_vs = MagicMock()
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vs)
-        tool_manager.register_tool(search_tool)
-
-        tools = [search_tool.get_tool_definition()]
 
-        generator = AIGenerator(api_key="test", model="test")
-        result = generator.generate_response(
-            query="What is Python?", tools=tools, tool_manager=tool_manager
+        result = ai_generator.generate_response(
+            query="What is Python?", tools=search_tool_defs, tool_manager=tool_manager
         )
 
         # Only one API call
-        assert mock_client.messages.create.call_count == 1
+        assert patched_anthropic.messages.create.call_count == 1
 
         # VectorStore should not be called
         mock_vs.search.assert_not_called()
@@ -261,27 +212,16 @@ class TestNoToolUsePath:
         # Direct response returned
         assert result == "Python is a programming language."
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_no_sources_for_direct_response(self, mock_anthropic_class):
+    def test_no_sources_for_direct_response(
+        self, patched_anthropic, ai_generator, search_tool_defs, tool_manager
+    ):
         """Verify no sources tracked when no tool is used."""
-        from ai_generator import AIGenerator
-
-        mock_client = MagicMock()
-        mock_client.messages.create.return_value = build_claude_text_response(
+        patched_anthropic.messages.create.return_value = build_claude_text_response(
             "General knowledge answer."
         )
-        mock_anthropic_class.return_value = mock_client
-
-        mock_vs = MagicMock()
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vs)
-        tool_manager.register_tool(search_tool)
 
-        tools = [search_tool.get_tool_definition()]
-
-        generator = AIGenerator(api_key="test", model="test")
-        generator.generate_response(
-            query="What is 2+2?", tools=tools, tool_manager=tool_manager
+        ai_generator.generate_response(
+            query="What is 2+2?", tools=search_tool_defs, tool_manager=tool_manager
         )
 
         # Sources should be empty
@@ -292,50 +232,47 @@ class TestNoToolUsePath:
 class TestSourcePopulation:
     """Tests for source population after searches."""
 
-    def test_sources_populated_after_search(self):
-        """Verify sources are correctly populated after search."""
-        mock_vs = MagicMock()
-        mock_vs.search.return_value = build_search_results(
-            documents=["Content 1", "Content 2"],
-            metadata=[
-                {"course_title": "Course A", "lesson_number": 1},
-                {"course_title": "Course B", "lesson_number": 2},
-            ],
-        )
-        mock_vs.get_lesson_link.side_effect = [
-            "https://coursea.com/1",
-            "https://courseb.com/2",
-        ]
-
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vs)
-        tool_manager.register_tool(search_tool)
+    @pytest.mark.parametrize(
+        "results_fixture, lesson_links, expected_sources",
+        [
+            pytest.param(
+                "two_course_search_results",
+                {
+                    ("Course A", 1): "https://coursea.com/1",
+                    ("Course B", 2): "https://courseb.com/2",
+                },
+                [
+                    {"title": "Course A", "lesson": 1, "url": "https://coursea.com/1"},
+                    {"title": "Course B", "lesson": 2, "url": "https://courseb.com/2"},
+                ],
+                id="two_courses",
+            ),
+            pytest.param("empty_search_results", {}, [], id="no_results"),
+        ],
+    )
+    def test_sources_populated_after_search(
+        self,
+        request,
+        mock_vs,
+        tool_manager,
+        results_fixture,
+        lesson_links,
+        expected_sources,
+    ):
+        """Verify sources mirror the search results, one per returned chunk."""
+        mock_vs.search.return_value = request.getfixturevalue(results_fixture)
+        # Keyed on (course_title, lesson_number), so call order doesn't matter
+        mock_vs.get_lesson_link.side_effect = lambda *key: lesson_links[key]
 
         tool_manager.execute_tool("search_course_content", query="test")
 
-        sources = tool_manager.get_last_sources()
+        assert tool_manager.get_last_sources() == expected_sources
 
-        assert len(sources) == 2
-        assert sources[0]["title"] == "Course A"
-        assert sources[0]["lesson"] == 1
-        assert sources[0]["url"] == "https://coursea.com/1"
-        assert sources[1]["title"] == "Course B"
-        assert sources[1]["lesson"] == 2
-        assert sources[1]["url"] == "https://courseb.com/2"
-
-    def test_sources_reset_clears_previous(self):
+    def test_sources_reset_clears_previous(self, mock_vs, tool_manager):
         """Verify reset_sources clears sources from previous queries."""
-        mock_vs = MagicMock()
-        mock_vs.search.return_value = build_search_results(
-            documents=["Content"],
-            metadata=[{"course_title": "Course", "lesson_number": 1}],
-        )
+        mock_vs.search.return_value = _SINGLE_COURSE_RESULTS
         mock_vs.get_lesson_link.return_value = "https://example.com"
 
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vs)
-        tool_manager.register_tool(search_tool)
-
         # First search
         tool_manager.execute_tool("search_course_content", query="first")
         assert len(tool_manager.get_last_sources()) == 1
@@ -344,71 +281,58 @@ class TestSourcePopulation:
         tool_manager.reset_sources()
         assert len(tool_manager.get_last_sources()) == 0
 
-    def test_sources_empty_when_no_results(self):
-        """Verify sources are empty when search returns no results."""
-        mock_vs = MagicMock()
-        mock_vs.search.return_value = build_search_results(
-            documents=[], metadata=[], distances=[]
-        )
-
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vs)
-        tool_manager.register_tool(search_tool)
-
-        tool_manager.execute_tool("search_course_content", query="nothing")
 
-        # Sources should be empty for empty results
-        sources = tool_manager.get_last_sources()
-        assert sources == []
+@pytest.fixture(scope="class")
+def registered_manager():
+    """
+    ToolManager with both course tools over a pre-configured stub, built once
+    per class and reset after each test by reset_registered_manager.
+    """
+    store = VectorStoreStub(
+        search_result=_GENERIC_SEARCH_RESULTS,
+        lesson_link="http://test",
+        outline={
+            "title": "Outline Course",
+            "course_link": "http://outline",
+            "lessons": [],
+        },
+    )
+    manager = ToolManager()
+    manager.register_tool(CourseSearchTool(store))
+    manager.register_tool(CourseOutlineTool(store))
+    return manager
 
 
 class TestMultipleToolRegistration:
     """Tests for systems with multiple registered tools."""
 
-    def test_both_tools_registered_and_accessible(self):
-        """Verify both search and outline tools can be registered."""
-        mock_vs = MagicMock()
-
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vs)
-        outline_tool = CourseOutlineTool(mock_vs)
+    @pytest.fixture(autouse=True)
+    def reset_registered_manager(self, registered_manager):
+        """Drop the sources and stub calls a test leaves on the shared manager."""
+        yield
+        registered_manager.reset_sources()
+        for tool in registered_manager.tools.values():
+            tool.store.reset()
 
-        tool_manager.register_tool(search_tool)
-        tool_manager.register_tool(outline_tool)
-
-        definitions = tool_manager.get_tool_definitions()
+    def test_both_tools_registered_and_accessible(self, registered_manager):
+        """Verify both search and outline tools can be registered."""
+        definitions = registered_manager.get_tool_definitions()
 
         assert len(definitions) == 2
         names = [d["name"] for d in definitions]
         assert "search_course_content" in names
         assert "get_course_outline" in names
 
-    def test_correct_tool_executed_by_name(self):
+    def test_correct_tool_executed_by_name(self, registered_manager):
         """Verify correct tool is executed based on name."""
-        mock_vs = MagicMock()
-        mock_vs.search.return_value = build_search_results(
-            documents=["Search result"],
-            metadata=[{"course_title": "C", "lesson_number": 1}],
-        )
-        mock_vs.get_lesson_link.return_value = "http://test"
-        mock_vs.get_course_outline.return_value = {
-            "title": "Outline Course",
-            "course_link": "http://outline",
-            "lessons": [],
-        }
-
-        tool_manager = ToolManager()
-        search_tool = CourseSearchTool(mock_vs)
-        outline_tool = CourseOutlineTool(mock_vs)
-        tool_manager.register_tool(search_tool)
-        tool_manager.register_tool(outline_tool)
-
         # Execute search
-        search_result = tool_manager.execute_tool("search_course_content", query="test")
+        search_result = registered_manager.execute_tool(
+            "search_course_content", query="test"
+        )
         assert "Search result" in search_result
 
         # Execute outline
-        outline_result = tool_manager.execute_tool(
+        outline_result = registered_manager.execute_tool(
             "get_course_outline", course_name="test"
         )
         assert "Outline Course" in outline_result
@@ -8,41 +8,137 @@ Tests evaluate:
 4. Tool result passing back to Claude
 """
 
-import sys
-from pathlib import Path
-from unittest.mock import MagicMock, Mock, patch
-
-# Add backend and tests to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import threading
+from functools import cache
+from types import SimpleNamespace
+from unittest.mock import ANY, AsyncMock, Mock, call, patch
 
+import numpy as np
+import pytest
 from ai_generator import AIGenerator
 from helpers import (
+    AnthropicClientStub,
     build_claude_mixed_response,
+    build_claude_multi_tool_use_response,
+    build_claude_stream,
     build_claude_text_response,
     build_claude_tool_use_response,
+    scripted_responses,
 )
+from llm_cache import LLMCache
+
+pytestmark = pytest.mark.unit
+
+
+@cache
+def text_response(text: str) -> SimpleNamespace:
+    """Shared read-only text response; tests that mutate one must build their own."""
+    return build_claude_text_response(text)
+
+
+def message_shape(messages: list[dict]) -> list[tuple[str, str]]:
+    """(role, first content block type) per message; plain strings count as text."""
+    shape = []
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            shape.append((message["role"], "text"))
+            continue
+        block = content[0]
+        block_type = block["type"] if isinstance(block, dict) else block.type
+        shape.append((message["role"], block_type))
+    return shape
+
+
+def drain_stream(stream) -> tuple[list[dict[str, str]], str]:
+    """Collect a response stream's events and the final answer it returns."""
+    events = []
+    while True:
+        try:
+            events.append(next(stream))
+        except StopIteration as stop:
+            return events, stop.value
+
+
+# Read-only tool schemas; AIGenerator copies rather than mutates them
+SEARCH_TOOL = {
+    "name": "search_course_content",
+    "description": "Test",
+    "input_schema": {},
+}
+OUTLINE_TOOL = {"name": "get_course_outline", "description": "Test", "input_schema": {}}
+SEARCH_TOOLS = [SEARCH_TOOL]
+BOTH_TOOLS = [OUTLINE_TOOL, SEARCH_TOOL]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def mock_anthropic_class():
+    """Patch anthropic.Anthropic once per module; autospec checks call signatures."""
+    with patch("ai_generator.anthropic.Anthropic", autospec=True) as anthropic_class:
+        yield anthropic_class
+
+
+@pytest.fixture(autouse=True)
+def reset_anthropic_class(mock_anthropic_class):
+    """Clear calls and per-test configuration left on the shared class mock."""
+    mock_anthropic_class.reset_mock(return_value=True, side_effect=True)
+
+
+@pytest.fixture
+def mock_client(mock_anthropic_class):
+    """Fresh client stub returned by the patched Anthropic class."""
+    client = AnthropicClientStub()
+    mock_anthropic_class.return_value = client
+    return client
+
+
+@pytest.fixture
+def generator(mock_client):
+    """AIGenerator wired to mock_client."""
+    return AIGenerator(api_key="test-key", model="claude-test")
 
 
 class TestAIGeneratorInitialization:
     """Tests for AIGenerator initialization."""
 
-    @patch("ai_generator.anthropic.Anthropic")
     def test_init_creates_anthropic_client(self, mock_anthropic_class):
         """Verify Anthropic client is created with API key."""
         generator = AIGenerator(api_key="test-key", model="claude-test")
 
-        mock_anthropic_class.assert_called_once_with(api_key="test-key")
+        mock_anthropic_class.assert_called_once_with(
+            api_key="test-key", http_client=ANY
+        )
+
+    def test_init_reuses_client_for_same_api_key(self, mock_anthropic_class):
+        """Verify generators sharing an API key share one pooled client."""
+        mock_anthropic_class.side_effect = lambda **kwargs: AnthropicClientStub()
+
+        first = AIGenerator(api_key="test-key", model="claude-test")
+        second = AIGenerator(api_key="test-key", model="claude-other")
+        other_key = AIGenerator(api_key="other-key", model="claude-test")
+
+        assert first.client is second.client
+        assert other_key.client is not first.client
+        assert mock_anthropic_class.call_count == 2
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_init_sets_model_from_parameter(self, mock_anthropic_class):
+    def test_init_uses_injected_client(self, mock_anthropic_class):
+        """Verify an injected client bypasses client creation."""
+        injected = AnthropicClientStub()
+
+        generator = AIGenerator(
+            api_key="test-key", model="claude-test", client=injected
+        )
+
+        assert generator.client is injected
+        mock_anthropic_class.assert_not_called()
+
+    def test_init_sets_model_from_parameter(self):
         """Verify model is stored correctly."""
         generator = AIGenerator(api_key="test-key", model="claude-sonnet-4-20250514")
 
         assert generator.model == "claude-sonnet-4-20250514"
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_base_params_set_correctly(self, mock_anthropic_class):
+    def test_base_params_set_correctly(self):
         """Verify base API parameters are configured."""
         generator = AIGenerator(api_key="test-key", model="claude-test")
 
@@ -54,410 +150,235 @@ class TestAIGeneratorInitialization:
 class TestAIGeneratorDirectResponse:
     """Tests for direct response handling (no tool use)."""
 
-    @patch("ai_generator.anthropic.Anthropic")
     def test_generate_response_returns_text_for_direct_answer(
-        self, mock_anthropic_class
+        self, mock_client, generator
     ):
         """Verify direct text response is extracted correctly."""
-        mock_client = MagicMock()
-        mock_client.messages.create.return_value = build_claude_text_response(
-            "Here is your answer."
-        )
-        mock_anthropic_class.return_value = mock_client
+        mock_client.messages.create.return_value = text_response("Here is your answer.")
 
-        generator = AIGenerator(api_key="test-key", model="claude-test")
         result = generator.generate_response(query="What is Python?")
 
         assert result == "Here is your answer."
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_includes_query_in_messages(self, mock_anthropic_class):
-        """Verify query is sent to API in messages."""
-        mock_client = MagicMock()
-        mock_client.messages.create.return_value = build_claude_text_response(
-            "Response"
-        )
-        mock_anthropic_class.return_value = mock_client
-
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        generator.generate_response(query="What is ML?")
-
-        call_kwargs = mock_client.messages.create.call_args.kwargs
-        messages = call_kwargs["messages"]
-
-        assert len(messages) == 1
-        assert messages[0]["role"] == "user"
-        assert messages[0]["content"] == "What is ML?"
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_includes_system_prompt(self, mock_anthropic_class):
-        """Verify system prompt is included in API call."""
-        mock_client = MagicMock()
-        mock_client.messages.create.return_value = build_claude_text_response(
-            "Response"
-        )
-        mock_anthropic_class.return_value = mock_client
-
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        generator.generate_response(query="Test")
-
-        call_kwargs = mock_client.messages.create.call_args.kwargs
-        assert "system" in call_kwargs
-        assert "AI assistant" in call_kwargs["system"]
-
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_includes_history_when_provided(
-        self, mock_anthropic_class
+def _check_plain_request(call_kwargs):
+    """Query-only request: cached system prompt, no history, no tools."""
+    assert call_kwargs["messages"] == [{"role": "user", "content": "What is ML?"}]
+
+    system_content = call_kwargs["system"]
+    assert system_content is AIGenerator._CACHED_SYSTEM_BLOCK
+    assert system_content[0]["text"] == AIGenerator.SYSTEM_PROMPT
+    assert "AI assistant" in system_content[0]["text"]
+    assert system_content[0]["cache_control"] == {"type": "ephemeral"}
+    assert "Previous conversation:" not in system_content[0]["text"]
+
+    assert "tools" not in call_kwargs
+    assert "tool_choice" not in call_kwargs
+
+
+def _check_history_request(call_kwargs):
+    """History is a separate, uncached block after the cached prompt."""
+    system_content = call_kwargs["system"]
+    assert len(system_content) == 2
+    assert system_content[0] is AIGenerator._CACHED_SYSTEM_BLOCK[0]
+
+    history_block = system_content[1]
+    assert "cache_control" not in history_block
+    assert "Previous conversation:" in history_block["text"]
+    assert "User: Hello" in history_block["text"]
+    assert "Assistant: Hi there!" in history_block["text"]
+
+
+def _check_tools_request(call_kwargs):
+    """Tools are sent with automatic tool choice."""
+    assert [t["name"] for t in call_kwargs["tools"]] == ["test_tool"]
+    assert call_kwargs["tool_choice"] == {"type": "auto"}
+
+
+class TestAIGeneratorRequestParams:
+    """Tests for the parameters sent with a single API request."""
+
+    @pytest.mark.parametrize(
+        "conversation_history, tools, check_request",
+        [
+            pytest.param(None, None, _check_plain_request, id="query_only"),
+            pytest.param(
+                "User: Hello\nAssistant: Hi there!",
+                None,
+                _check_history_request,
+                id="with_history",
+            ),
+            pytest.param(
+                None,
+                [
+                    {
+                        "name": "test_tool",
+                        "description": "A test tool",
+                        "input_schema": {},
+                    }
+                ],
+                _check_tools_request,
+                id="with_tools",
+            ),
+        ],
+    )
+    def test_request_params(
+        self, mock_client, generator, conversation_history, tools, check_request
     ):
-        """Verify conversation history is appended to system prompt."""
-        mock_client = MagicMock()
-        mock_client.messages.create.return_value = build_claude_text_response(
-            "Response"
-        )
-        mock_anthropic_class.return_value = mock_client
+        """Verify messages, system blocks and tool params of the API call."""
+        mock_client.messages.create.return_value = text_response("Response")
 
-        generator = AIGenerator(api_key="test-key", model="claude-test")
         generator.generate_response(
-            query="Follow up question",
-            conversation_history="User: Hello\nAssistant: Hi there!",
-        )
-
-        call_kwargs = mock_client.messages.create.call_args.kwargs
-        system_content = call_kwargs["system"]
-
-        assert "Previous conversation:" in system_content
-        assert "User: Hello" in system_content
-        assert "Assistant: Hi there!" in system_content
-
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_no_history_in_system_when_none(
-        self, mock_anthropic_class
-    ):
-        """Verify clean system prompt when no history."""
-        mock_client = MagicMock()
-        mock_client.messages.create.return_value = build_claude_text_response(
-            "Response"
+            query="What is ML?",
+            conversation_history=conversation_history,
+            tools=tools,
         )
-        mock_anthropic_class.return_value = mock_client
-
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        generator.generate_response(query="Test", conversation_history=None)
 
-        call_kwargs = mock_client.messages.create.call_args.kwargs
-        system_content = call_kwargs["system"]
-
-        assert "Previous conversation:" not in system_content
+        check_request(mock_client.messages.create.call_args.kwargs)
 
 
 class TestAIGeneratorToolHandling:
     """Tests for tool definition handling."""
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_includes_tools_when_provided(self, mock_anthropic_class):
-        """Verify tools are included in API call when provided."""
-        mock_client = MagicMock()
-        mock_client.messages.create.return_value = build_claude_text_response(
-            "Response"
-        )
-        mock_anthropic_class.return_value = mock_client
+    def test_generate_response_caches_tool_schemas_on_last_tool(
+        self, mock_client, generator
+    ):
+        """Verify only the last tool is marked for caching, without mutating input."""
+        mock_client.messages.create.return_value = text_response("Response")
 
         tools = [
-            {"name": "test_tool", "description": "A test tool", "input_schema": {}}
+            {"name": "tool_a", "description": "A", "input_schema": {}},
+            {"name": "tool_b", "description": "B", "input_schema": {}},
         ]
 
-        generator = AIGenerator(api_key="test-key", model="claude-test")
         generator.generate_response(query="Test", tools=tools)
 
-        call_kwargs = mock_client.messages.create.call_args.kwargs
-        assert "tools" in call_kwargs
-        assert call_kwargs["tools"] == tools
-
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_sets_tool_choice_auto(self, mock_anthropic_class):
-        """Verify tool_choice is set to auto when tools provided."""
-        mock_client = MagicMock()
-        mock_client.messages.create.return_value = build_claude_text_response(
-            "Response"
+        sent_tools = mock_client.messages.create.call_args.kwargs["tools"]
+        assert "cache_control" not in sent_tools[0]
+        assert sent_tools[1]["cache_control"] == {"type": "ephemeral"}
+        assert "cache_control" not in tools[1]
+
+    def test_generate_response_records_cache_usage(self, mock_client, generator):
+        """Verify prompt cache token counts are exposed via last_usage."""
+        # Fresh response: this test overwrites its usage
+        response = build_claude_text_response("Response")
+        response.usage = SimpleNamespace(
+            input_tokens=10,
+            output_tokens=5,
+            cache_creation_input_tokens=0,
+            cache_read_input_tokens=400,
         )
-        mock_anthropic_class.return_value = mock_client
+        mock_client.messages.create.return_value = response
 
-        tools = [{"name": "test_tool", "description": "Test", "input_schema": {}}]
+        generator.generate_response(query="Test")
 
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        generator.generate_response(query="Test", tools=tools)
+        assert generator.last_usage["cache_read_input_tokens"] == 400
+        assert generator.last_usage["cache_creation_input_tokens"] == 0
 
-        call_kwargs = mock_client.messages.create.call_args.kwargs
-        assert call_kwargs["tool_choice"] == {"type": "auto"}
+    def test_generate_response_without_tools_skips_tool_manager(
+        self, mock_client, generator, mock_tool_manager
+    ):
+        """Verify the no-tools path makes one call and never runs tools."""
+        mock_client.messages.create.return_value = text_response("Response")
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_no_tools_param_when_none(self, mock_anthropic_class):
-        """Verify tools parameter not included when None."""
-        mock_client = MagicMock()
-        mock_client.messages.create.return_value = build_claude_text_response(
-            "Response"
+        result = generator.generate_response(
+            query="Test", tools=None, tool_manager=mock_tool_manager
         )
-        mock_anthropic_class.return_value = mock_client
 
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        generator.generate_response(query="Test", tools=None)
-
-        call_kwargs = mock_client.messages.create.call_args.kwargs
-        assert "tools" not in call_kwargs
-        assert "tool_choice" not in call_kwargs
+        assert result == "Response"
+        mock_client.messages.create.assert_called_once()
+        mock_tool_manager.execute_tool.assert_not_called()
 
 
 class TestAIGeneratorToolExecution:
     """Tests for tool use detection and execution."""
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_detects_tool_use_stop_reason(self, mock_anthropic_class):
-        """Verify tool_use stop_reason triggers tool execution."""
-        mock_client = MagicMock()
-
-        # First response triggers tool use
-        tool_response = build_claude_tool_use_response(
-            tool_name="search_course_content",
-            tool_input={"query": "test"},
-            tool_id="tool_123",
-        )
-
-        # Second response is final text
-        final_response = build_claude_text_response("Final answer")
-
-        mock_client.messages.create.side_effect = [tool_response, final_response]
-        mock_anthropic_class.return_value = mock_client
-
-        # Create mock tool manager
-        mock_tool_manager = MagicMock()
-        mock_tool_manager.execute_tool.return_value = "Tool result"
-
-        tools = [
-            {"name": "search_course_content", "description": "Test", "input_schema": {}}
-        ]
-
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        result = generator.generate_response(
-            query="Test", tools=tools, tool_manager=mock_tool_manager
-        )
-
-        # Should have called API twice
-        assert mock_client.messages.create.call_count == 2
-        assert result == "Final answer"
-
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_calls_tool_manager_execute(self, mock_anthropic_class):
-        """Verify tool_manager.execute_tool is called."""
-        mock_client = MagicMock()
-
-        tool_response = build_claude_tool_use_response(
-            tool_name="search_course_content",
-            tool_input={"query": "neural networks"},
-            tool_id="tool_abc",
-        )
-        final_response = build_claude_text_response("Answer about neural networks")
-
-        mock_client.messages.create.side_effect = [tool_response, final_response]
-        mock_anthropic_class.return_value = mock_client
-
-        mock_tool_manager = MagicMock()
-        mock_tool_manager.execute_tool.return_value = (
-            "[ML Course]\nNeural network content"
-        )
-
-        tools = [
-            {"name": "search_course_content", "description": "Test", "input_schema": {}}
-        ]
-
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        generator.generate_response(
-            query="Tell me about neural networks",
-            tools=tools,
-            tool_manager=mock_tool_manager,
-        )
-
-        mock_tool_manager.execute_tool.assert_called_once()
-
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_generate_response_passes_correct_tool_input(self, mock_anthropic_class):
-        """Verify tool input kwargs are forwarded correctly."""
-        mock_client = MagicMock()
+    @pytest.fixture
+    def tool_exec_scenario(self, mock_client, generator, mock_tool_manager):
+        """
+        Run one search tool round trip and return what the assertions need.
 
+        Returns:
+            Tuple of (result, messages.create call_args_list, execute_tool
+            call_args_list)
+        """
         tool_response = build_claude_tool_use_response(
             tool_name="search_course_content",
             tool_input={"query": "python basics", "course_name": "Python 101"},
             tool_id="tool_xyz",
         )
-        final_response = build_claude_text_response("Here's info about Python")
-
-        mock_client.messages.create.side_effect = [tool_response, final_response]
-        mock_anthropic_class.return_value = mock_client
-
-        mock_tool_manager = MagicMock()
-        mock_tool_manager.execute_tool.return_value = "Python content"
-
-        tools = [
-            {"name": "search_course_content", "description": "Test", "input_schema": {}}
-        ]
-
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        generator.generate_response(
-            query="Python basics", tools=tools, tool_manager=mock_tool_manager
-        )
-
-        mock_tool_manager.execute_tool.assert_called_with(
-            "search_course_content", query="python basics", course_name="Python 101"
+        final_response = text_response("This is the synthesized final answer")
+        mock_client.messages.create.side_effect = scripted_responses(
+            tool_response, final_response
         )
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_handle_tool_execution_adds_tool_results_message(
-        self, mock_anthropic_class
-    ):
-        """Verify tool results are added to messages for follow-up."""
-        mock_client = MagicMock()
-
-        tool_response = build_claude_tool_use_response(
-            tool_name="search_course_content",
-            tool_input={"query": "test"},
-            tool_id="tool_result_id",
-        )
-        final_response = build_claude_text_response("Based on the results...")
-
-        mock_client.messages.create.side_effect = [tool_response, final_response]
-        mock_anthropic_class.return_value = mock_client
-
-        mock_tool_manager = MagicMock()
         mock_tool_manager.execute_tool.return_value = "Tool execution result"
 
-        tools = [
-            {"name": "search_course_content", "description": "Test", "input_schema": {}}
-        ]
-
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        generator.generate_response(
-            query="Test", tools=tools, tool_manager=mock_tool_manager
+        result = generator.generate_response(
+            query="Python basics", tools=SEARCH_TOOLS, tool_manager=mock_tool_manager
         )
 
-        # Check second API call includes tool results
-        second_call_kwargs = mock_client.messages.create.call_args_list[1].kwargs
-        messages = second_call_kwargs["messages"]
-
-        # Should have: user query, assistant tool_use, user tool_result
-        assert len(messages) == 3
-
-        # Last message should be tool result
-        tool_result_msg = messages[2]
-        assert tool_result_msg["role"] == "user"
-        assert tool_result_msg["content"][0]["type"] == "tool_result"
-        assert tool_result_msg["content"][0]["tool_use_id"] == "tool_result_id"
-        assert tool_result_msg["content"][0]["content"] == "Tool execution result"
-
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_handle_tool_execution_makes_follow_up_call(self, mock_anthropic_class):
-        """Verify second API call is made after tool execution."""
-        mock_client = MagicMock()
-
-        tool_response = build_claude_tool_use_response(
-            tool_name="search_course_content",
-            tool_input={"query": "test"},
-            tool_id="tool_id",
+        return (
+            result,
+            mock_client.messages.create.call_args_list,
+            mock_tool_manager.execute_tool.call_args_list,
         )
-        final_response = build_claude_text_response("Final synthesized answer")
 
-        mock_client.messages.create.side_effect = [tool_response, final_response]
-        mock_anthropic_class.return_value = mock_client
+    def test_tool_execution_scenario(self, tool_exec_scenario):
+        """Verify tool_use triggers execution, a follow-up call and the final text."""
+        result, create_calls, execute_calls = tool_exec_scenario
 
-        mock_tool_manager = MagicMock()
-        mock_tool_manager.execute_tool.return_value = "Tool result"
+        # tool_use stop_reason leads to a follow-up call with the final answer
+        assert len(create_calls) == 2
+        assert result == "This is the synthesized final answer"
 
-        tools = [
-            {"name": "search_course_content", "description": "Test", "input_schema": {}}
+        # Tool input kwargs are forwarded to the tool manager once
+        assert execute_calls == [
+            call(
+                "search_course_content",
+                query="python basics",
+                course_name="Python 101",
+            )
         ]
 
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        generator.generate_response(
-            query="Test", tools=tools, tool_manager=mock_tool_manager
-        )
-
-        # Verify two API calls were made
-        assert mock_client.messages.create.call_count == 2
-
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_handle_tool_execution_returns_final_text(self, mock_anthropic_class):
-        """Verify final text response is returned after tool execution."""
-        mock_client = MagicMock()
-
-        tool_response = build_claude_tool_use_response(
-            tool_name="search_course_content",
-            tool_input={"query": "test"},
-            tool_id="tool_id",
-        )
-        final_response = build_claude_text_response(
-            "This is the synthesized final answer"
-        )
-
-        mock_client.messages.create.side_effect = [tool_response, final_response]
-        mock_anthropic_class.return_value = mock_client
-
-        mock_tool_manager = MagicMock()
-        mock_tool_manager.execute_tool.return_value = "Tool result"
-
-        tools = [
-            {"name": "search_course_content", "description": "Test", "input_schema": {}}
+        # Follow-up messages: user query, assistant tool_use, user tool_result
+        messages = create_calls[1].kwargs["messages"]
+        assert message_shape(messages) == [
+            ("user", "text"),
+            ("assistant", "tool_use"),
+            ("user", "tool_result"),
         ]
 
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        result = generator.generate_response(
-            query="Test", tools=tools, tool_manager=mock_tool_manager
-        )
-
-        assert result == "This is the synthesized final answer"
+        tool_result_msg = messages[2]
+        assert tool_result_msg["content"][0]["tool_use_id"] == "tool_xyz"
+        assert tool_result_msg["content"][0]["content"] == "Tool execution result"
 
 
 class TestAIGeneratorMultipleToolCalls:
     """Tests for handling multiple tool calls in single response."""
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_handles_multiple_tool_calls(self, mock_anthropic_class):
+    def test_handles_multiple_tool_calls(
+        self, mock_client, generator, mock_tool_manager
+    ):
         """Verify all tool calls are executed when multiple present."""
-        mock_client = MagicMock()
-
         # Create response with two tool calls
-        tool_block_1 = Mock()
-        tool_block_1.type = "tool_use"
-        tool_block_1.name = "search_course_content"
-        tool_block_1.input = {"query": "first query"}
-        tool_block_1.id = "tool_1"
-
-        tool_block_2 = Mock()
-        tool_block_2.type = "tool_use"
-        tool_block_2.name = "get_course_outline"
-        tool_block_2.input = {"course_name": "ML Course"}
-        tool_block_2.id = "tool_2"
-
-        multi_tool_response = Mock()
-        multi_tool_response.stop_reason = "tool_use"
-        multi_tool_response.content = [tool_block_1, tool_block_2]
-
-        final_response = build_claude_text_response("Combined answer")
+        multi_tool_response = build_claude_multi_tool_use_response(
+            [
+                ("search_course_content", {"query": "first query"}, "tool_1"),
+                ("get_course_outline", {"course_name": "ML Course"}, "tool_2"),
+            ]
+        )
 
-        mock_client.messages.create.side_effect = [multi_tool_response, final_response]
-        mock_anthropic_class.return_value = mock_client
+        final_response = text_response("Combined answer")
 
-        mock_tool_manager = MagicMock()
-        mock_tool_manager.execute_tool.side_effect = ["Result 1", "Result 2"]
+        mock_client.messages.create.side_effect = scripted_responses(
+            multi_tool_response, final_response
+        )
 
-        tools = [
-            {
-                "name": "search_course_content",
-                "description": "Test",
-                "input_schema": {},
-            },
-            {"name": "get_course_outline", "description": "Test", "input_schema": {}},
-        ]
+        mock_tool_manager.execute_tool.side_effect = iter(("Result 1", "Result 2"))
 
-        generator = AIGenerator(api_key="test-key", model="claude-test")
         result = generator.generate_response(
-            query="Test", tools=tools, tool_manager=mock_tool_manager
+            query="Test", tools=BOTH_TOOLS, tool_manager=mock_tool_manager
         )
 
         # Both tools should have been executed
@@ -468,37 +389,24 @@ class TestAIGeneratorMultipleToolCalls:
 class TestAIGeneratorNoToolManager:
     """Tests for behavior when tool_manager is not provided."""
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_returns_direct_response_without_tool_manager(self, mock_anthropic_class):
+    def test_returns_direct_response_without_tool_manager(self, mock_client, generator):
         """When tool_manager is None, tool_use response should be handled differently."""
-        mock_client = MagicMock()
-
         # Even if Claude wants to use tools, without tool_manager we can't execute
-        tool_response = build_claude_tool_use_response(
+        # Text block first, as the fallback answer
+        tool_response = build_claude_mixed_response(
+            text="I would search for...",
             tool_name="search_course_content",
             tool_input={"query": "test"},
             tool_id="tool_id",
         )
-        # Add a text block for fallback
-        text_block = Mock()
-        text_block.type = "text"
-        text_block.text = "I would search for..."
-        tool_response.content.insert(0, text_block)
 
         mock_client.messages.create.return_value = tool_response
-        mock_anthropic_class.return_value = mock_client
-
-        tools = [
-            {"name": "search_course_content", "description": "Test", "input_schema": {}}
-        ]
-
-        generator = AIGenerator(api_key="test-key", model="claude-test")
 
         # Without tool_manager, should not crash and return something
         # Based on the code, it checks stop_reason == "tool_use" AND tool_manager
         # If tool_manager is None, it falls through to return response.content[0].text
         result = generator.generate_response(
-            query="Test", tools=tools, tool_manager=None
+            query="Test", tools=SEARCH_TOOLS, tool_manager=None
         )
 
         # Should return the first content block's text
@@ -508,115 +416,75 @@ class TestAIGeneratorNoToolManager:
 class TestAIGeneratorSequentialToolCalls:
     """Tests for sequential tool calling behavior (up to 2 rounds)."""
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_two_sequential_tool_calls(self, mock_anthropic_class):
-        """Verify 2 tools execute in sequence (3 API calls total)."""
-        mock_client = MagicMock()
+    @pytest.fixture
+    def run_scenario(self, mock_client, generator, mock_tool_manager):
+        """
+        Factory running generate_response against scripted API responses.
 
-        # Round 1: get_course_outline
-        outline_response = build_claude_tool_use_response(
-            tool_name="get_course_outline",
-            tool_input={"course_name": "ML Course"},
-            tool_id="tool_1",
-        )
+        Returns:
+            Callable returning (result, messages.create call_args_list,
+            execute_tool call_args_list)
+        """
+
+        def _run(api_responses, tool_results=(), tools=BOTH_TOOLS, query="Test"):
+            mock_client.messages.create.side_effect = scripted_responses(*api_responses)
+            mock_tool_manager.execute_tool.side_effect = iter(tool_results)
 
-        # Round 2: search_course_content
+            result = generator.generate_response(
+                query=query, tools=tools, tool_manager=mock_tool_manager
+            )
+            return (
+                result,
+                mock_client.messages.create.call_args_list,
+                mock_tool_manager.execute_tool.call_args_list,
+            )
+
+        return _run
+
+    def test_two_sequential_tool_calls(self, run_scenario, claude_responses):
+        """Verify 2 tools execute in sequence (3 API calls total)."""
+        outline_response = claude_responses.outline_tool_use
         search_response = build_claude_tool_use_response(
             tool_name="search_course_content",
             tool_input={"query": "neural networks"},
             tool_id="tool_2",
         )
-
-        # Final: text response
-        final_response = build_claude_text_response(
-            "Found matching content in both courses."
-        )
-
-        mock_client.messages.create.side_effect = [
-            outline_response,
-            search_response,
-            final_response,
-        ]
-        mock_anthropic_class.return_value = mock_client
-
-        mock_tool_manager = MagicMock()
-        mock_tool_manager.execute_tool.side_effect = [
-            "Course: ML\nLesson 4: Neural Networks",
-            "[Deep Learning]\nNeural networks content",
-        ]
-
-        tools = [
-            {
-                "name": "get_course_outline",
-                "description": "Get outline",
-                "input_schema": {},
-            },
-            {
-                "name": "search_course_content",
-                "description": "Search",
-                "input_schema": {},
-            },
-        ]
-
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        result = generator.generate_response(
+        final_response = text_response("Found matching content in both courses.")
+
+        result, api_calls, tool_calls = run_scenario(
+            [outline_response, search_response, final_response],
+            [
+                "Course: ML\nLesson 4: Neural Networks",
+                "[Deep Learning]\nNeural networks content",
+            ],
             query="Find similar content to lesson 4 of ML Course",
-            tools=tools,
-            tool_manager=mock_tool_manager,
         )
 
-        # Verify 3 API calls total
-        assert mock_client.messages.create.call_count == 3
-
-        # Verify both tools executed
-        assert mock_tool_manager.execute_tool.call_count == 2
-
-        # Verify final result
+        assert len(api_calls) == 3
+        assert len(tool_calls) == 2
         assert result == "Found matching content in both courses."
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_single_tool_call_still_works(self, mock_anthropic_class):
+    def test_single_tool_call_still_works(self, run_scenario):
         """Backward compatibility - 1 tool works (2 API calls)."""
-        mock_client = MagicMock()
-
         tool_response = build_claude_tool_use_response(
             tool_name="search_course_content",
             tool_input={"query": "test"},
             tool_id="tool_1",
         )
-
         # After first tool, Claude returns text (no second tool)
-        final_response = build_claude_text_response("Here is the answer.")
-
-        mock_client.messages.create.side_effect = [tool_response, final_response]
-        mock_anthropic_class.return_value = mock_client
-
-        mock_tool_manager = MagicMock()
-        mock_tool_manager.execute_tool.return_value = "Tool result"
+        final_response = text_response("Here is the answer.")
 
-        tools = [
-            {
-                "name": "search_course_content",
-                "description": "Search",
-                "input_schema": {},
-            }
-        ]
-
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        result = generator.generate_response(
-            query="Test", tools=tools, tool_manager=mock_tool_manager
+        result, api_calls, tool_calls = run_scenario(
+            [tool_response, final_response], ["Tool result"], tools=SEARCH_TOOLS
         )
 
-        # Should only have 2 API calls (initial + after tool)
-        assert mock_client.messages.create.call_count == 2
-        assert mock_tool_manager.execute_tool.call_count == 1
+        # Initial call + one after the tool
+        assert len(api_calls) == 2
+        assert len(tool_calls) == 1
         assert result == "Here is the answer."
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_max_rounds_enforced(self, mock_anthropic_class):
+    def test_max_rounds_enforced(self, run_scenario):
         """Loop stops after 2 rounds even if Claude wants more tools."""
-        mock_client = MagicMock()
-
         # Claude keeps requesting tools
         tool_response_1 = build_claude_tool_use_response(
             tool_name="get_course_outline",
@@ -636,89 +504,59 @@ class TestAIGeneratorSequentialToolCalls:
             tool_id="tool_3",
         )
 
-        mock_client.messages.create.side_effect = [
-            tool_response_1,
-            tool_response_2,
-            tool_response_3,
-        ]
-        mock_anthropic_class.return_value = mock_client
-
-        mock_tool_manager = MagicMock()
-        mock_tool_manager.execute_tool.return_value = "Result"
-
-        tools = [
-            {
-                "name": "get_course_outline",
-                "description": "Get outline",
-                "input_schema": {},
-            },
-            {
-                "name": "search_course_content",
-                "description": "Search",
-                "input_schema": {},
-            },
-        ]
-
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        result = generator.generate_response(
-            query="Test", tools=tools, tool_manager=mock_tool_manager
+        result, api_calls, tool_calls = run_scenario(
+            [tool_response_1, tool_response_2, tool_response_3], ["Result"] * 2
         )
 
-        # Should have exactly 3 API calls (initial + 2 rounds)
-        assert mock_client.messages.create.call_count == 3
-
-        # Only 2 tool executions (max rounds)
-        assert mock_tool_manager.execute_tool.call_count == 2
+        # Initial call + 2 rounds, and only 2 tool executions
+        assert len(api_calls) == 3
+        assert len(tool_calls) == 2
 
         # Should return partial text from mixed response
         assert result == "Partial answer"
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_tools_available_in_follow_up_call(self, mock_anthropic_class):
-        """Verify tools key present in 2nd API call."""
-        mock_client = MagicMock()
+    def test_max_rounds_without_text_returns_fallback(self, run_scenario):
+        """Verify fallback message when the last response has no text block."""
+        result, _, _ = run_scenario(
+            [
+                build_claude_tool_use_response(
+                    tool_name="search_course_content",
+                    tool_input={"query": f"query {i}"},
+                    tool_id=f"tool_{i}",
+                )
+                for i in range(3)
+            ],
+            ["Result"] * 2,
+            tools=SEARCH_TOOLS,
+        )
 
+        assert result == AIGenerator.NO_RESPONSE_TEXT
+
+    def test_tools_available_in_follow_up_call(self, run_scenario):
+        """Verify tools key present in 2nd API call."""
         tool_response = build_claude_tool_use_response(
             tool_name="get_course_outline",
             tool_input={"course_name": "Test"},
             tool_id="tool_1",
         )
-        final_response = build_claude_text_response("Done")
-
-        mock_client.messages.create.side_effect = [tool_response, final_response]
-        mock_anthropic_class.return_value = mock_client
-
-        mock_tool_manager = MagicMock()
-        mock_tool_manager.execute_tool.return_value = "Outline"
-
-        tools = [
-            {
-                "name": "get_course_outline",
-                "description": "Get outline",
-                "input_schema": {},
-            },
-            {
-                "name": "search_course_content",
-                "description": "Search",
-                "input_schema": {},
-            },
-        ]
 
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        generator.generate_response(
-            query="Test", tools=tools, tool_manager=mock_tool_manager
+        _, api_calls, _ = run_scenario(
+            [tool_response, text_response("Done")], ["Outline"]
         )
 
-        # Check second API call includes tools
-        second_call_kwargs = mock_client.messages.create.call_args_list[1].kwargs
-        assert "tools" in second_call_kwargs
-        assert second_call_kwargs["tools"] == tools
+        # Both calls share one params dict, so compare each against the
+        # expected definitions rather than against each other
+        expected_tools = [
+            OUTLINE_TOOL,
+            {**SEARCH_TOOL, "cache_control": {"type": "ephemeral"}},
+        ]
+        assert len(api_calls) == 2
+        for api_call in api_calls:
+            assert api_call.kwargs["tools"] == expected_tools
+            assert api_call.kwargs["system"] == AIGenerator._CACHED_SYSTEM_BLOCK
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_message_history_accumulates(self, mock_anthropic_class):
+    def test_message_history_accumulates(self, run_scenario, claude_responses):
         """Verify messages contain full tool call history."""
-        mock_client = MagicMock()
-
         outline_response = build_claude_tool_use_response(
             tool_name="get_course_outline",
             tool_input={"course_name": "ML"},
@@ -729,76 +567,462 @@ class TestAIGeneratorSequentialToolCalls:
             tool_input={"query": "neural nets"},
             tool_id="tool_search",
         )
-        final_response = build_claude_text_response("Final answer")
 
-        mock_client.messages.create.side_effect = [
-            outline_response,
-            search_response,
-            final_response,
+        _, api_calls, _ = run_scenario(
+            [outline_response, search_response, claude_responses.final_answer],
+            ["Outline result", "Search result"],
+            query="Find similar content",
+        )
+
+        # Third (final) API call has the full history:
+        # user query, assistant(tool1), user(result1), assistant(tool2), user(result2)
+        assert message_shape(api_calls[2].kwargs["messages"]) == [
+            ("user", "text"),
+            ("assistant", "tool_use"),
+            ("user", "tool_result"),
+            ("assistant", "tool_use"),
+            ("user", "tool_result"),
         ]
-        mock_anthropic_class.return_value = mock_client
 
-        mock_tool_manager = MagicMock()
-        mock_tool_manager.execute_tool.side_effect = ["Outline result", "Search result"]
+    def test_no_tool_call_returns_direct_response(self, run_scenario):
+        """No change to direct response behavior."""
+        result, api_calls, tool_calls = run_scenario(
+            [text_response("Direct answer without tools.")],
+            tools=SEARCH_TOOLS,
+            query="What is Python?",
+        )
 
-        tools = [
-            {
-                "name": "get_course_outline",
-                "description": "Get outline",
-                "input_schema": {},
-            },
-            {
-                "name": "search_course_content",
-                "description": "Search",
-                "input_schema": {},
-            },
+        # Only 1 API call - no tool execution
+        assert len(api_calls) == 1
+        assert tool_calls == []
+        assert result == "Direct answer without tools."
+
+
+class TestAIGeneratorAsync:
+    """Tests for the async generation path."""
+
+    @patch("ai_generator.anthropic.AsyncAnthropic")
+    async def test_async_client_created_lazily(self, mock_async_class):
+        """Verify the async client is only built on first async use."""
+        mock_async_class.return_value.messages.create = AsyncMock(
+            return_value=text_response("Async answer")
+        )
+
+        generator = AIGenerator(api_key="test-key", model="claude-test", client=Mock())
+        mock_async_class.assert_not_called()
+
+        result = await generator.agenerate_response(query="What is Python?")
+
+        assert result == "Async answer"
+        mock_async_class.assert_called_once_with(api_key="test-key", http_client=ANY)
+
+    async def test_async_runs_round_tool_calls_concurrently(self, mock_tool_manager):
+        """Verify a round's tool calls overlap and their results keep block order."""
+        multi_tool_response = build_claude_multi_tool_use_response(
+            [
+                ("search_course_content", {"query": "first query"}, "tool_1"),
+                ("get_course_outline", {"course_name": "ML Course"}, "tool_2"),
+            ]
+        )
+
+        mock_async_client = AnthropicClientStub()
+        mock_async_client.messages.create = AsyncMock(
+            side_effect=scripted_responses(
+                multi_tool_response, text_response("Combined answer")
+            )
+        )
+
+        # Each call waits for the other, so sequential execution would time out
+        both_running = threading.Barrier(2, timeout=5)
+
+        def execute_with_sources(name, **kwargs):
+            both_running.wait()
+            return f"Result for {name}", [{"title": name}]
+
+        mock_tool_manager.execute_tool_with_sources.side_effect = execute_with_sources
+
+        generator = AIGenerator(
+            api_key="test-key",
+            model="claude-test",
+            client=AnthropicClientStub(),
+            async_client=mock_async_client,
+        )
+        result = await generator.agenerate_response(
+            query="Test", tools=BOTH_TOOLS, tool_manager=mock_tool_manager
+        )
+
+        assert result == "Combined answer"
+        assert mock_tool_manager.execute_tool_with_sources.call_count == 2
+        mock_tool_manager.execute_tool.assert_not_called()
+        assert mock_tool_manager.record_sources.call_args_list == [
+            call("search_course_content", [{"title": "search_course_content"}]),
+            call("get_course_outline", [{"title": "get_course_outline"}]),
         ]
 
-        generator = AIGenerator(api_key="test-key", model="claude-test")
+        messages = mock_async_client.messages.create.call_args_list[1].kwargs[
+            "messages"
+        ]
+        tool_results = messages[2]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == ["tool_1", "tool_2"]
+        assert [r["content"] for r in tool_results] == [
+            "Result for search_course_content",
+            "Result for get_course_outline",
+        ]
+
+
+class TestAIGeneratorResponseCache:
+    """Tests for the response cache in front of the API."""
+
+    def test_repeated_query_served_from_cache(self):
+        """Verify a direct answer is cached and the second call skips the API."""
+        mock_client = AnthropicClientStub()
+        mock_client.messages.create.return_value = text_response("Cached answer")
+        cache = LLMCache()
+
+        generator = AIGenerator(
+            api_key="test-key", model="claude-test", client=mock_client, cache=cache
+        )
+        first = generator.generate_response(query="What is Python?")
+        second = generator.generate_response(query="What is Python?")
+
+        assert first == second == "Cached answer"
+        assert mock_client.messages.create.call_count == 1
+        assert cache.stats == {"hits": 1, "misses": 1}
+
+    def test_tool_answers_not_cached(self, mock_tool_manager, claude_responses):
+        """Verify answers produced via tool execution are not cached."""
+        mock_client = AnthropicClientStub()
+        search_tool_use = claude_responses.search_tool_use
+        tool_answer = text_response("Tool answer")
+        mock_client.messages.create.side_effect = scripted_responses(
+            search_tool_use, tool_answer, search_tool_use, tool_answer
+        )
+        mock_tool_manager.execute_tool.return_value = "Tool result"
+        generator = AIGenerator(
+            api_key="test-key",
+            model="claude-test",
+            client=mock_client,
+            cache=LLMCache(),
+        )
+        for _ in range(2):
+            generator.generate_response(
+                query="Test", tools=SEARCH_TOOLS, tool_manager=mock_tool_manager
+            )
+
+        assert mock_client.messages.create.call_count == 4
+
+    def test_history_is_part_of_cache_key(self):
+        """Verify different conversation context does not reuse an answer."""
+        mock_client = AnthropicClientStub()
+        mock_client.messages.create.return_value = text_response("Answer")
+
+        generator = AIGenerator(
+            api_key="test-key",
+            model="claude-test",
+            client=mock_client,
+            cache=LLMCache(),
+        )
+        generator.generate_response(query="Tell me more", conversation_history="A")
+        generator.generate_response(query="Tell me more", conversation_history="B")
+
+        assert mock_client.messages.create.call_count == 2
+
+    def test_tools_are_part_of_cache_key(self):
+        """Verify an answer given without tools is not reused when tools are offered."""
+        mock_client = AnthropicClientStub()
+        mock_client.messages.create.return_value = text_response("Answer")
+
+        generator = AIGenerator(
+            api_key="test-key",
+            model="claude-test",
+            client=mock_client,
+            cache=LLMCache(),
+        )
+        generator.generate_response(query="What is Python?")
+        generator.generate_response(query="What is Python?", tools=SEARCH_TOOLS)
+
+        assert mock_client.messages.create.call_count == 2
+
+    def test_semantic_lookup_embeds_raw_question(self):
+        """Verify the cache embeds semantic_query rather than the wrapped prompt."""
+        mock_client = AnthropicClientStub()
+        mock_client.messages.create.return_value = text_response("Answer")
+        embedder = Mock()
+        embedder.encode.return_value = np.ones(3, dtype=np.float32)
+
+        generator = AIGenerator(
+            api_key="test-key",
+            model="claude-test",
+            client=mock_client,
+            cache=LLMCache(embedder=embedder),
+        )
         generator.generate_response(
-            query="Find similar content", tools=tools, tool_manager=mock_tool_manager
+            query="Answer this question about course materials: What is Python?",
+            semantic_query="What is Python?",
         )
 
-        # Check third (final) API call has full history
-        third_call_kwargs = mock_client.messages.create.call_args_list[2].kwargs
-        messages = third_call_kwargs["messages"]
+        assert embedder.encode.call_args.args == ("What is Python?",)
+
+    async def test_async_cache_lookup_runs_off_event_loop(self):
+        """Verify the blocking question embedding runs in a worker thread."""
+        mock_client = AnthropicClientStub()
+        async_client = AnthropicClientStub()
+        async_client.messages.create = AsyncMock(return_value=text_response("Answer"))
+        loop_thread = threading.get_ident()
+        embed_threads = []
+
+        def encode(text, **kwargs):
+            embed_threads.append(threading.get_ident())
+            return np.ones(3, dtype=np.float32)
+
+        generator = AIGenerator(
+            api_key="test-key",
+            model="claude-test",
+            client=mock_client,
+            async_client=async_client,
+            cache=LLMCache(embedder=Mock(encode=Mock(side_effect=encode))),
+        )
+        await generator.agenerate_response(query="What is Python?")
 
-        # Expected: user query, assistant(tool1), user(result1), assistant(tool2), user(result2)
-        assert len(messages) == 5
+        assert embed_threads and loop_thread not in embed_threads
 
-        # Verify structure
-        assert messages[0]["role"] == "user"
-        assert messages[1]["role"] == "assistant"
-        assert messages[2]["role"] == "user"
-        assert messages[2]["content"][0]["type"] == "tool_result"
-        assert messages[3]["role"] == "assistant"
-        assert messages[4]["role"] == "user"
-        assert messages[4]["content"][0]["type"] == "tool_result"
 
-    @patch("ai_generator.anthropic.Anthropic")
-    def test_no_tool_call_returns_direct_response(self, mock_anthropic_class):
-        """No change to direct response behavior."""
-        mock_client = MagicMock()
-        mock_client.messages.create.return_value = build_claude_text_response(
-            "Direct answer without tools."
+class TestAIGeneratorTokenEfficientTools:
+    """Tests for the token-efficient tool use beta."""
+
+    def test_beta_used_for_claude_3_7_with_tools(self):
+        """Verify beta endpoint and header are used for Claude 3.7 tool calls."""
+        mock_client = AnthropicClientStub()
+        mock_client.beta.messages.create.return_value = text_response("Answer")
+
+        generator = AIGenerator(
+            api_key="test-key", model="claude-3-7-sonnet-20250219", client=mock_client
         )
-        mock_anthropic_class.return_value = mock_client
+        generator.generate_response(query="Test", tools=SEARCH_TOOLS)
 
-        tools = [
-            {
-                "name": "search_course_content",
-                "description": "Search",
-                "input_schema": {},
-            }
+        call_kwargs = mock_client.beta.messages.create.call_args.kwargs
+        assert call_kwargs["betas"] == [AIGenerator.TOKEN_EFFICIENT_TOOLS_BETA]
+        mock_client.messages.create.assert_not_called()
+
+    def test_beta_skipped_without_tools(self):
+        """Verify plain endpoint is used when no tools are supplied."""
+        mock_client = AnthropicClientStub()
+        mock_client.messages.create.return_value = text_response("Answer")
+
+        generator = AIGenerator(
+            api_key="test-key", model="claude-3-7-sonnet-20250219", client=mock_client
+        )
+        generator.generate_response(query="Test")
+
+        mock_client.beta.messages.create.assert_not_called()
+
+    def test_beta_skipped_for_other_models_or_when_disabled(self):
+        """Verify beta is not requested for Claude 4 or when the flag is off."""
+        claude_4 = AIGenerator(
+            api_key="test-key",
+            model="claude-sonnet-4-20250514",
+            client=AnthropicClientStub(),
+        )
+        disabled = AIGenerator(
+            api_key="test-key",
+            model="claude-3-7-sonnet-20250219",
+            client=AnthropicClientStub(),
+            token_efficient_tools=False,
+        )
+
+        assert claude_4.token_efficient_tools is False
+        assert disabled.token_efficient_tools is False
+
+    BETA_CASES = pytest.mark.parametrize(
+        "model, tools, uses_beta",
+        [
+            ("claude-3-7-sonnet-20250219", SEARCH_TOOLS, True),
+            ("claude-3-7-sonnet-20250219", None, False),
+            ("claude-sonnet-4-20250514", SEARCH_TOOLS, False),
+        ],
+        ids=["claude_3_7_with_tools", "claude_3_7_without_tools", "claude_4"],
+    )
+
+    @staticmethod
+    def assert_endpoint(client, method: str, uses_beta: bool):
+        """Check exactly one of the plain/beta endpoints was called, and how."""
+        beta_call = getattr(client.beta.messages, method)
+        plain_call = getattr(client.messages, method)
+        used, unused = (beta_call, plain_call) if uses_beta else (plain_call, beta_call)
+
+        used.assert_called_once()
+        unused.assert_not_called()
+        if uses_beta:
+            assert used.call_args.kwargs["betas"] == [
+                AIGenerator.TOKEN_EFFICIENT_TOOLS_BETA
+            ]
+        else:
+            assert "betas" not in used.call_args.kwargs
+
+    @BETA_CASES
+    def test_stream_beta_endpoint_choice(self, model, tools, uses_beta):
+        """Verify streaming uses the beta endpoint only for Claude 3.7 tool calls."""
+        mock_client = AnthropicClientStub()
+        for endpoint in (mock_client.messages, mock_client.beta.messages):
+            endpoint.stream.return_value = build_claude_stream(
+                ["Answer"], text_response("Answer")
+            )
+
+        generator = AIGenerator(api_key="test-key", model=model, client=mock_client)
+        drain_stream(generator.generate_response_stream(query="Test", tools=tools))
+
+        self.assert_endpoint(mock_client, "stream", uses_beta)
+
+    @BETA_CASES
+    async def test_async_beta_endpoint_choice(self, model, tools, uses_beta):
+        """Verify async calls use the beta endpoint only for Claude 3.7 tool calls."""
+        async_client = AnthropicClientStub()
+        for endpoint in (async_client.messages, async_client.beta.messages):
+            endpoint.create = AsyncMock(return_value=text_response("Answer"))
+
+        generator = AIGenerator(
+            api_key="test-key",
+            model=model,
+            client=AnthropicClientStub(),
+            async_client=async_client,
+        )
+        await generator.agenerate_response(query="Test", tools=tools)
+
+        self.assert_endpoint(async_client, "create", uses_beta)
+
+
+class TestAIGeneratorStreaming:
+    """Tests for streamed response generation."""
+
+    def test_stream_yields_text_chunks(self):
+        """Verify direct answers are yielded chunk by chunk."""
+        mock_client = AnthropicClientStub()
+        mock_client.messages.stream.return_value = build_claude_stream(
+            ["Python ", "is a language."],
+            text_response("Python is a language."),
+        )
+
+        generator = AIGenerator(
+            api_key="test-key", model="claude-test", client=mock_client
+        )
+        events = list(generator.generate_response_stream(query="What is Python?"))
+
+        # Without tools no round can end in tool use, so tokens stream live
+        assert events == [
+            {"type": "text", "text": "Python "},
+            {"type": "text", "text": "is a language."},
+        ]
+        mock_client.messages.create.assert_not_called()
+
+    def test_stream_executes_tools_then_streams_follow_up(self, mock_tool_manager):
+        """Verify tool rounds run before the follow-up answer is streamed."""
+        mock_client = AnthropicClientStub()
+        mock_client.messages.stream.side_effect = [
+            build_claude_stream(
+                [],
+                build_claude_tool_use_response(
+                    tool_name="search_course_content",
+                    tool_input={"query": "neural networks"},
+                    tool_id="tool_1",
+                ),
+            ),
+            build_claude_stream(
+                ["Neural ", "networks..."],
+                text_response("Neural networks..."),
+            ),
         ]
-        mock_tool_manager = MagicMock()
+        mock_tool_manager.execute_tool.return_value = "Tool result"
+        generator = AIGenerator(
+            api_key="test-key", model="claude-test", client=mock_client
+        )
+        events = list(
+            generator.generate_response_stream(
+                query="Test", tools=SEARCH_TOOLS, tool_manager=mock_tool_manager
+            )
+        )
 
-        generator = AIGenerator(api_key="test-key", model="claude-test")
-        result = generator.generate_response(
-            query="What is Python?", tools=tools, tool_manager=mock_tool_manager
+        # The follow-up may still call tools, so it arrives once its stop is known
+        assert events == [{"type": "text", "text": "Neural networks..."}]
+        mock_tool_manager.execute_tool.assert_called_once_with(
+            "search_course_content", query="neural networks"
+        )
+        messages = mock_client.messages.stream.call_args.kwargs["messages"]
+        assert messages[2]["content"][0]["tool_use_id"] == "tool_1"
+
+    def test_stream_answer_excludes_tool_round_preamble(self, mock_tool_manager):
+        """Verify tool-round text is a status event and not part of the answer."""
+        mock_client = AnthropicClientStub()
+        mock_client.messages.stream.side_effect = [
+            build_claude_stream(
+                ["Let me search."],
+                build_claude_mixed_response(
+                    "Let me search.",
+                    tool_name="search_course_content",
+                    tool_input={"query": "neural networks"},
+                ),
+            ),
+            build_claude_stream(
+                ["Neural networks..."], text_response("Neural networks...")
+            ),
+        ]
+        mock_tool_manager.execute_tool.return_value = "Tool result"
+        generator = AIGenerator(
+            api_key="test-key", model="claude-test", client=mock_client
         )
 
-        # Only 1 API call - no tool execution
-        assert mock_client.messages.create.call_count == 1
-        assert mock_tool_manager.execute_tool.call_count == 0
-        assert result == "Direct answer without tools."
+        events, answer = drain_stream(
+            generator.generate_response_stream(
+                query="Test", tools=SEARCH_TOOLS, tool_manager=mock_tool_manager
+            )
+        )
+
+        assert events == [
+            {"type": "status", "text": "Let me search."},
+            {"type": "text", "text": "Neural networks..."},
+        ]
+        assert answer == "Neural networks..."
+
+    def test_stream_returns_direct_answer(self):
+        """Verify a direct streamed answer is also returned in full."""
+        mock_client = AnthropicClientStub()
+        mock_client.messages.stream.return_value = build_claude_stream(
+            ["Python ", "is a language."],
+            text_response("Python is a language."),
+        )
+        generator = AIGenerator(
+            api_key="test-key", model="claude-test", client=mock_client
+        )
+
+        _, answer = drain_stream(
+            generator.generate_response_stream(query="What is Python?")
+        )
+
+        assert answer == "Python is a language."
+
+    def test_stream_last_round_streams_live(self, mock_tool_manager):
+        """Verify the last allowed round streams tokens since it cannot run tools."""
+        mock_client = AnthropicClientStub()
+        tool_use = build_claude_tool_use_response(
+            tool_name="search_course_content", tool_input={"query": "q"}
+        )
+        mock_client.messages.stream.side_effect = [
+            build_claude_stream([], tool_use),
+            build_claude_stream([], tool_use),
+            build_claude_stream(["Final ", "answer"], text_response("Final answer")),
+        ]
+        mock_tool_manager.execute_tool.return_value = "Tool result"
+        generator = AIGenerator(
+            api_key="test-key", model="claude-test", client=mock_client
+        )
+
+        events, answer = drain_stream(
+            generator.generate_response_stream(
+                query="Test", tools=SEARCH_TOOLS, tool_manager=mock_tool_manager
+            )
+        )
+
+        assert events == [
+            {"type": "text", "text": "Final "},
+            {"type": "text", "text": "answer"},
+        ]
+        assert answer == "Final answer"
@@ -9,71 +9,105 @@ Tests evaluate:
 5. Parameter passing to VectorStore
 """
 
-import sys
-from pathlib import Path
-
-# Add backend and tests to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-from helpers import build_search_results
+import pytest
+from helpers import VectorStoreStub, build_search_results
 from search_tools import CourseSearchTool
 from vector_store import SearchResults
 
+# Read-only search results; CourseSearchTool never mutates them
+_NEURAL_NETWORKS_RESULTS = build_search_results(
+    documents=("Content about neural networks.",),
+    metadata=({"course_title": "ML Course", "lesson_number": 1},),
+    distances=(0.3,),
+)
+_NO_LESSON_RESULTS = build_search_results(
+    documents=("Some content.",),
+    metadata=({"course_title": "Advanced Python", "lesson_number": None},),
+)
+_LESSON_3_RESULTS = build_search_results(
+    documents=("Lesson content.",),
+    metadata=({"course_title": "ML Basics", "lesson_number": 3},),
+)
+_GENERAL_COURSE_RESULTS = build_search_results(
+    documents=("Content without lesson.",),
+    metadata=({"course_title": "General Course", "lesson_number": None},),
+)
+_UNLINKED_LESSON_RESULTS = build_search_results(
+    documents=("Doc 1",),
+    metadata=({"course_title": "Course A", "lesson_number": None},),
+)
+_FIRST_COURSE_RESULTS = build_search_results(
+    documents=("First doc",),
+    metadata=({"course_title": "First Course", "lesson_number": 1},),
+)
+_SECOND_COURSE_RESULTS = build_search_results(
+    documents=("Second doc",),
+    metadata=({"course_title": "Second Course", "lesson_number": 2},),
+)
+
+# Lesson URLs for two_course_search_results, by (course_title, lesson_number)
+_LESSON_LINKS = {
+    ("Course A", 1): "https://coursea.com/1",
+    ("Course B", 2): "https://courseb.com/2",
+}
+
+
+def _check_name(definition):
+    """Tool name is 'search_course_content'."""
+    assert definition["name"] == "search_course_content"
+
+
+def _check_description(definition):
+    """Tool has a meaningful description."""
+    assert "description" in definition
+    assert len(definition["description"]) > 0
+
+
+def _check_schema(definition):
+    """input_schema is properly structured."""
+    assert "input_schema" in definition
+    schema = definition["input_schema"]
+    assert schema["type"] == "object"
+    assert "properties" in schema
+    assert "required" in schema
+
+
+def _check_requires_query(definition):
+    """query is the only required parameter."""
+    assert definition["input_schema"]["required"] == ["query"]
+
+
+def _check_optional_course_name(definition):
+    """course_name is an optional parameter."""
+    properties = definition["input_schema"]["properties"]
+    assert "course_name" in properties
+    assert "course_name" not in definition["input_schema"]["required"]
+
+
+def _check_optional_lesson_number(definition):
+    """lesson_number is an optional integer parameter."""
+    properties = definition["input_schema"]["properties"]
+    assert "lesson_number" in properties
+    assert properties["lesson_number"]["type"] == "integer"
+
 
 class TestCourseSearchToolDefinition:
     """Tests for tool definition schema."""
 
-    def test_tool_definition_has_correct_name(self, mock_vector_store):
-        """Verify tool name is 'search_course_content'."""
-        tool = CourseSearchTool(mock_vector_store)
-        definition = tool.get_tool_definition()
-
-        assert definition["name"] == "search_course_content"
-
-    def test_tool_definition_has_description(self, mock_vector_store):
-        """Verify tool has a meaningful description."""
-        tool = CourseSearchTool(mock_vector_store)
-        definition = tool.get_tool_definition()
-
-        assert "description" in definition
-        assert len(definition["description"]) > 0
-
-    def test_tool_definition_has_valid_schema(self, mock_vector_store):
-        """Verify input_schema is properly structured."""
-        tool = CourseSearchTool(mock_vector_store)
-        definition = tool.get_tool_definition()
-
-        assert "input_schema" in definition
-        schema = definition["input_schema"]
-        assert schema["type"] == "object"
-        assert "properties" in schema
-        assert "required" in schema
-
-    def test_tool_definition_requires_query(self, mock_vector_store):
-        """Verify query is the only required parameter."""
-        tool = CourseSearchTool(mock_vector_store)
-        definition = tool.get_tool_definition()
-
-        assert definition["input_schema"]["required"] == ["query"]
-
-    def test_tool_definition_has_optional_course_name(self, mock_vector_store):
-        """Verify course_name is an optional parameter."""
-        tool = CourseSearchTool(mock_vector_store)
-        definition = tool.get_tool_definition()
-
-        properties = definition["input_schema"]["properties"]
-        assert "course_name" in properties
-        assert "course_name" not in definition["input_schema"]["required"]
-
-    def test_tool_definition_has_optional_lesson_number(self, mock_vector_store):
-        """Verify lesson_number is an optional parameter."""
-        tool = CourseSearchTool(mock_vector_store)
-        definition = tool.get_tool_definition()
-
-        properties = definition["input_schema"]["properties"]
-        assert "lesson_number" in properties
-        assert properties["lesson_number"]["type"] == "integer"
+    @pytest.mark.parametrize(
+        "check_definition",
+        [
+            pytest.param(_check_name, id="name"),
+            pytest.param(_check_description, id="description"),
+            pytest.param(_check_schema, id="schema"),
+            pytest.param(_check_requires_query, id="requires_query"),
+            pytest.param(_check_optional_course_name, id="optional_course_name"),
+            pytest.param(_check_optional_lesson_number, id="optional_lesson_number"),
+        ],
+    )
+    def test_tool_definition(self, course_search_tool_definition, check_definition):
+        """Verify one property of the shared tool definition."""
+        check_definition(course_search_tool_definition)
 
 
 class TestCourseSearchToolExecuteSuccess:
@@ -82,11 +116,7 @@ class TestCourseSearchToolExecuteSuccess:
     def test_execute_returns_formatted_results_single_doc(self, mock_vector_store):
         """Verify single result is formatted with header."""
         # Setup single result
-        mock_vector_store.search.return_value = build_search_results(
-            documents=["Content about neural networks."],
-            metadata=[{"course_title": "ML Course", "lesson_number": 1}],
-            distances=[0.3],
-        )
+        mock_vector_store.search.return_value = _NEURAL_NETWORKS_RESULTS
 
         tool = CourseSearchTool(mock_vector_store)
         result = tool.execute(query="neural networks")
@@ -94,16 +124,11 @@ class TestCourseSearchToolExecuteSuccess:
         assert "[ML Course - Lesson 1]" in result
         assert "Content about neural networks." in result
 
-    def test_execute_returns_formatted_results_multiple_docs(self, mock_vector_store):
+    def test_execute_returns_formatted_results_multiple_docs(
+        self, mock_vector_store, two_course_search_results
+    ):
         """Verify multiple results are separated by double newline."""
-        mock_vector_store.search.return_value = build_search_results(
-            documents=["First result content.", "Second result content."],
-            metadata=[
-                {"course_title": "Course A", "lesson_number": 1},
-                {"course_title": "Course B", "lesson_number": 2},
-            ],
-            distances=[0.3, 0.5],
-        )
+        mock_vector_store.search.return_value = two_course_search_results
 
         tool = CourseSearchTool(mock_vector_store)
         result = tool.execute(query="test query")
@@ -115,10 +140,7 @@ class TestCourseSearchToolExecuteSuccess:
 
     def test_execute_includes_course_title_in_header(self, mock_vector_store):
         """Verify course title appears in header."""
-        mock_vector_store.search.return_value = build_search_results(
-            documents=["Some content."],
-            metadata=[{"course_title": "Advanced Python", "lesson_number": None}],
-        )
+        mock_vector_store.search.return_value = _NO_LESSON_RESULTS
 
         tool = CourseSearchTool(mock_vector_store)
         result = tool.execute(query="python")
@@ -127,10 +149,7 @@ class TestCourseSearchToolExecuteSuccess:
 
     def test_execute_includes_lesson_number_when_present(self, mock_vector_store):
         """Verify lesson number appears in header when available."""
-        mock_vector_store.search.return_value = build_search_results(
-            documents=["Lesson content."],
-            metadata=[{"course_title": "ML Basics", "lesson_number": 3}],
-        )
+        mock_vector_store.search.return_value = _LESSON_3_RESULTS
 
         tool = CourseSearchTool(mock_vector_store)
         result = tool.execute(query="basics")
@@ -140,10 +159,7 @@ class TestCourseSearchToolExecuteSuccess:
 
     def test_execute_omits_lesson_from_header_when_none(self, mock_vector_store):
         """Verify header format when lesson_number is None."""
-        mock_vector_store.search.return_value = build_search_results(
-            documents=["Content without lesson."],
-            metadata=[{"course_title": "General Course", "lesson_number": None}],
-        )
+        mock_vector_store.search.return_value = _GENERAL_COURSE_RESULTS
 
         tool = CourseSearchTool(mock_vector_store)
         result = tool.execute(query="general")
@@ -155,42 +171,38 @@ class TestCourseSearchToolExecuteSuccess:
 class TestCourseSearchToolExecuteEmpty:
     """Tests for empty result handling."""
 
-    def test_execute_returns_no_content_message_when_empty(
-        self, mock_vector_store_empty
-    ):
-        """Verify empty results return appropriate message."""
-        tool = CourseSearchTool(mock_vector_store_empty)
-        result = tool.execute(query="nonexistent topic")
-
-        assert "No relevant content found" in result
-
-    def test_execute_empty_includes_course_filter_in_message(
-        self, mock_vector_store_empty
-    ):
-        """Verify course filter mentioned in empty result message."""
-        tool = CourseSearchTool(mock_vector_store_empty)
-        result = tool.execute(query="test", course_name="Python Basics")
-
-        assert "course 'Python Basics'" in result
-
-    def test_execute_empty_includes_lesson_filter_in_message(
-        self, mock_vector_store_empty
-    ):
-        """Verify lesson filter mentioned in empty result message."""
-        tool = CourseSearchTool(mock_vector_store_empty)
-        result = tool.execute(query="test", lesson_number=5)
-
-        assert "lesson 5" in result
-
-    def test_execute_empty_includes_both_filters_in_message(
-        self, mock_vector_store_empty
-    ):
-        """Verify both filters mentioned when both provided."""
+    @pytest.mark.parametrize(
+        "kwargs, expected",
+        [
+            pytest.param(
+                {"query": "nonexistent topic"},
+                ["No relevant content found"],
+                id="no_filters",
+            ),
+            pytest.param(
+                {"query": "test", "course_name": "Python Basics"},
+                ["course 'Python Basics'"],
+                id="course_filter",
+            ),
+            pytest.param(
+                {"query": "test", "lesson_number": 5},
+                ["lesson 5"],
+                id="lesson_filter",
+            ),
+            pytest.param(
+                {"query": "test", "course_name": "ML", "lesson_number": 2},
+                ["course 'ML'", "lesson 2"],
+                id="both_filters",
+            ),
+        ],
+    )
+    def test_execute_empty_message(self, mock_vector_store_empty, kwargs, expected):
+        """Verify empty results return a message naming the applied filters."""
         tool = CourseSearchTool(mock_vector_store_empty)
-        result = tool.execute(query="test", course_name="ML", lesson_number=2)
+        result = tool.execute(**kwargs)
 
-        assert "course 'ML'" in result
-        assert "lesson 2" in result
+        for text in expected:
+            assert text in result
 
 
 class TestCourseSearchToolExecuteError:
@@ -218,85 +230,79 @@ class TestCourseSearchToolExecuteError:
 class TestCourseSearchToolParameterPassing:
     """Tests for verifying parameters are passed correctly to VectorStore."""
 
-    def test_execute_passes_query_to_vector_store(self, mock_vector_store):
-        """Verify query parameter is passed to search."""
-        tool = CourseSearchTool(mock_vector_store)
-        tool.execute(query="machine learning")
-
-        mock_vector_store.search.assert_called_once()
-        call_kwargs = mock_vector_store.search.call_args.kwargs
-        assert call_kwargs["query"] == "machine learning"
-
-    def test_execute_passes_course_name_to_vector_store(self, mock_vector_store):
-        """Verify course_name parameter is passed to search."""
-        tool = CourseSearchTool(mock_vector_store)
-        tool.execute(query="test", course_name="Python Course")
-
-        call_kwargs = mock_vector_store.search.call_args.kwargs
-        assert call_kwargs["course_name"] == "Python Course"
-
-    def test_execute_passes_lesson_number_to_vector_store(self, mock_vector_store):
-        """Verify lesson_number parameter is passed to search."""
-        tool = CourseSearchTool(mock_vector_store)
-        tool.execute(query="test", lesson_number=3)
-
-        call_kwargs = mock_vector_store.search.call_args.kwargs
-        assert call_kwargs["lesson_number"] == 3
-
-    def test_execute_handles_none_optional_parameters(self, mock_vector_store):
-        """Verify None values for optional params are handled."""
+    @pytest.mark.parametrize(
+        "execute_kwargs, expected",
+        [
+            pytest.param(
+                {"query": "machine learning"},
+                {
+                    "query": "machine learning",
+                    "course_name": None,
+                    "lesson_number": None,
+                },
+                id="query",
+            ),
+            pytest.param(
+                {"query": "test", "course_name": "Python Course"},
+                {
+                    "query": "test",
+                    "course_name": "Python Course",
+                    "lesson_number": None,
+                },
+                id="course_name",
+            ),
+            pytest.param(
+                {"query": "test", "lesson_number": 3},
+                {"query": "test", "course_name": None, "lesson_number": 3},
+                id="lesson_number",
+            ),
+            pytest.param(
+                {"query": "test", "course_name": None, "lesson_number": None},
+                {"query": "test", "course_name": None, "lesson_number": None},
+                id="explicit_none",
+            ),
+        ],
+    )
+    def test_execute_passes_params_to_vector_store(
+        self, mock_vector_store, execute_kwargs, expected
+    ):
+        """Verify execute forwards its filters to one search call as keywords."""
         tool = CourseSearchTool(mock_vector_store)
-        tool.execute(query="test", course_name=None, lesson_number=None)
+        tool.execute(**execute_kwargs)
 
-        call_kwargs = mock_vector_store.search.call_args.kwargs
-        assert call_kwargs["course_name"] is None
-        assert call_kwargs["lesson_number"] is None
+        mock_vector_store.search.assert_called_once_with(**expected)
 
 
 class TestCourseSearchToolSourceTracking:
     """Tests for source tracking functionality."""
 
-    def test_execute_tracks_sources_correctly(self, mock_vector_store):
-        """Verify last_sources is populated with correct structure."""
-        mock_vector_store.search.return_value = build_search_results(
-            documents=["Content here."],
-            metadata=[{"course_title": "Test Course", "lesson_number": 1}],
-        )
-        mock_vector_store.get_lesson_link.return_value = "https://example.com/lesson/1"
-
-        tool = CourseSearchTool(mock_vector_store)
+    @pytest.fixture(scope="class")
+    def executed_tool(self, two_course_search_results):
+        """Tool after one search over two lesson results; only read by tests."""
+        store = VectorStoreStub(search_result=two_course_search_results)
+        # Keyed on (course_title, lesson_number), so each source gets its own URL
+        store.get_lesson_link.side_effect = lambda *key: _LESSON_LINKS[key]
+        tool = CourseSearchTool(store)
         tool.execute(query="test")
+        return tool
 
-        assert len(tool.last_sources) == 1
-        source = tool.last_sources[0]
-        assert source["title"] == "Test Course"
-        assert source["lesson"] == 1
-        assert source["url"] == "https://example.com/lesson/1"
+    def test_execute_tracks_sources_correctly(self, executed_tool):
+        """Verify last_sources is populated with correct structure."""
+        assert executed_tool.last_sources == [
+            {"title": "Course A", "lesson": 1, "url": "https://coursea.com/1"},
+            {"title": "Course B", "lesson": 2, "url": "https://courseb.com/2"},
+        ]
 
-    def test_execute_calls_get_lesson_link_for_each_result(self, mock_vector_store):
+    def test_execute_calls_get_lesson_link_for_each_result(self, executed_tool):
         """Verify URL lookup is called for each result with lesson number."""
-        mock_vector_store.search.return_value = build_search_results(
-            documents=["Doc 1", "Doc 2"],
-            metadata=[
-                {"course_title": "Course A", "lesson_number": 1},
-                {"course_title": "Course B", "lesson_number": 2},
-            ],
-        )
-
-        tool = CourseSearchTool(mock_vector_store)
-        tool.execute(query="test")
-
         # Should be called twice, once for each result
-        assert mock_vector_store.get_lesson_link.call_count == 2
+        assert executed_tool.store.get_lesson_link.call_count == 2
 
     def test_execute_does_not_call_get_lesson_link_when_lesson_is_none(
         self, mock_vector_store
     ):
         """Verify URL lookup is skipped when lesson_number is None."""
-        mock_vector_store.search.return_value = build_search_results(
-            documents=["Doc 1"],
-            metadata=[{"course_title": "Course A", "lesson_number": None}],
-        )
+        mock_vector_store.search.return_value = _UNLINKED_LESSON_RESULTS
 
         tool = CourseSearchTool(mock_vector_store)
         tool.execute(query="test")
@@ -306,10 +312,7 @@ class TestCourseSearchToolSourceTracking:
 
     def test_last_sources_reset_on_new_execute(self, mock_vector_store):
         """Verify sources are replaced on each execute call."""
-        mock_vector_store.search.return_value = build_search_results(
-            documents=["First doc"],
-            metadata=[{"course_title": "First Course", "lesson_number": 1}],
-        )
+        mock_vector_store.search.return_value = _FIRST_COURSE_RESULTS
 
         tool = CourseSearchTool(mock_vector_store)
 
@@ -318,10 +321,7 @@ class TestCourseSearchToolSourceTracking:
         assert tool.last_sources[0]["title"] == "First Course"
 
         # Change mock response
-        mock_vector_store.search.return_value = build_search_results(
-            documents=["Second doc"],
-            metadata=[{"course_title": "Second Course", "lesson_number": 2}],
-        )
+        mock_vector_store.search.return_value = _SECOND_COURSE_RESULTS
 
         # Second execute should replace sources
         tool.execute(query="second")
@@ -337,17 +337,9 @@ class TestCourseSearchToolSourceTracking:
         # The last_sources is initialized as empty list
         assert tool.last_sources == []
 
-    def test_source_structure_has_required_keys(self, mock_vector_store):
+    def test_source_structure_has_required_keys(self, executed_tool):
         """Verify each source has title, lesson, and url keys."""
-        mock_vector_store.search.return_value = build_search_results(
-            documents=["Content"],
-            metadata=[{"course_title": "Test", "lesson_number": 1}],
-        )
-
-        tool = CourseSearchTool(mock_vector_store)
-        tool.execute(query="test")
-
-        source = tool.last_sources[0]
-        assert "title" in source
-        assert "lesson" in source
-        assert "url" in source
+        for source in executed_tool.last_sources:
+            assert "title" in source
+            assert "lesson" in source
+            assert "url" in source
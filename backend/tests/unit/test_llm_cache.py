@@ -0,0 +1,163 @@
+"""
+Unit tests for LLMCache.
+
+Tests evaluate:
+1. Exact-match key lookup
+2. Semantic (embedding similarity) lookup
+3. LRU eviction
+4. Hit/miss statistics
+5. Concurrent access from worker threads
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from llm_cache import LLMCache
+
+# Fixed embeddings so similarity is predictable
+EMBEDDINGS = {
+    "What is ML?": [1.0, 0.0, 0.0],
+    "What's machine learning?": [0.99, 0.1, 0.0],
+    "How do I cook pasta?": [0.0, 0.0, 1.0],
+}
+
+
+class FakeEmbedder:
+    """Stand-in for SentenceTransformer with a normalizing encode()."""
+
+    def encode(self, text, convert_to_numpy=True, normalize_embeddings=False):
+        vector = np.asarray(EMBEDDINGS[text], dtype=np.float32)
+        if normalize_embeddings:
+            vector = vector / np.linalg.norm(vector)
+        return vector
+
+
+class TestLLMCacheKeys:
+    """Tests for exact-match keys."""
+
+    def test_make_key_is_stable(self):
+        """Verify identical inputs produce identical keys."""
+        assert LLMCache.make_key("m", "q", None) == LLMCache.make_key("m", "q", None)
+
+    def test_make_key_depends_on_model_query_history_and_tools(self):
+        """Verify each key component changes the key."""
+        base = LLMCache.make_key("m", "q", None)
+
+        assert LLMCache.make_key("other", "q", None) != base
+        assert LLMCache.make_key("m", "other", None) != base
+        assert LLMCache.make_key("m", "q", "User: hi") != base
+        assert LLMCache.make_key("m", "q", None, ["search_course_content"]) != base
+
+
+class TestLLMCacheLookup:
+    """Tests for exact and semantic lookup."""
+
+    def test_exact_hit_returns_response(self):
+        """Verify stored response is returned for same key."""
+        cache = LLMCache()
+        key = LLMCache.make_key("m", "What is ML?", None)
+        cache.set(key, None, "ML answer")
+
+        response, _ = cache.lookup(key, "What is ML?")
+
+        assert response == "ML answer"
+        assert cache.stats == {"hits": 1, "misses": 0}
+
+    def test_miss_without_embedder_skips_semantic(self):
+        """Verify only exact matching is done when no embedder is set."""
+        cache = LLMCache()
+
+        response, embedding = cache.lookup("missing", "What is ML?")
+
+        assert response is None
+        assert embedding is None
+        assert cache.stats == {"hits": 0, "misses": 1}
+
+    def test_semantic_hit_for_paraphrase(self):
+        """Verify similar queries above threshold reuse the cached response."""
+        cache = LLMCache(embedder=FakeEmbedder())
+        cache.set("key_ml", cache.embed("What is ML?"), "ML answer")
+
+        response, _ = cache.lookup("key_paraphrase", "What's machine learning?")
+
+        assert response == "ML answer"
+
+    def test_semantic_miss_below_threshold(self):
+        """Verify unrelated queries are not matched and return their embedding."""
+        cache = LLMCache(embedder=FakeEmbedder())
+        cache.set("key_ml", cache.embed("What is ML?"), "ML answer")
+
+        response, embedding = cache.lookup("key_pasta", "How do I cook pasta?")
+
+        assert response is None
+        assert embedding is not None
+        assert cache.stats["misses"] == 1
+
+    def test_semantic_disabled_by_flag(self):
+        """Verify semantic=False restricts lookup to exact keys."""
+        cache = LLMCache(embedder=FakeEmbedder())
+        cache.set("key_ml", cache.embed("What is ML?"), "ML answer")
+
+        response, _ = cache.lookup(
+            "key_paraphrase", "What's machine learning?", semantic=False
+        )
+
+        assert response is None
+
+    @pytest.mark.parametrize(
+        "other_scope",
+        [
+            LLMCache.make_scope("claude-3-5-haiku", ["search_course_content"]),
+            LLMCache.make_scope("claude-sonnet-4", []),
+        ],
+        ids=["different_model", "different_tools"],
+    )
+    def test_semantic_match_requires_same_scope(self, other_scope):
+        """Verify paraphrases only reuse answers from the same model and tools."""
+        scope = LLMCache.make_scope("claude-sonnet-4", ["search_course_content"])
+        cache = LLMCache(embedder=FakeEmbedder())
+        cache.set("key_ml", cache.embed("What is ML?"), "ML answer", scope=scope)
+
+        missed, _ = cache.lookup(
+            "key_other", "What's machine learning?", scope=other_scope
+        )
+        hit, _ = cache.lookup("key_same", "What's machine learning?", scope=scope)
+
+        assert missed is None
+        assert hit == "ML answer"
+
+
+class TestLLMCacheEviction:
+    """Tests for LRU eviction."""
+
+    def test_evicts_least_recently_used(self):
+        """Verify oldest untouched entry is evicted when full."""
+        cache = LLMCache(max_entries=2)
+        cache.set("a", None, "A")
+        cache.set("b", None, "B")
+        cache.get_exact("a")  # refresh "a"
+        cache.set("c", None, "C")
+
+        assert cache.get_exact("a") == "A"
+        assert cache.get_exact("b") is None
+        assert cache.get_exact("c") == "C"
+
+
+class TestLLMCacheConcurrency:
+    """Tests for access from several worker threads at once."""
+
+    def test_concurrent_access_stays_bounded(self):
+        """Verify threads setting and reading at once never exceed max_entries."""
+        cache = LLMCache(max_entries=8)
+
+        def set_and_get(i):
+            key = str(i % 32)
+            cache.set(key, None, key)
+            cache.lookup(key, key, semantic=False)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(set_and_get, range(2000)))
+
+        assert len(cache._entries) == 8
+        assert sum(cache.stats.values()) == 2000
@@ -7,14 +7,40 @@ Tests evaluate:
 3. Attribute storage
 """
 
-import sys
-from pathlib import Path
-
-# Add backend to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from functools import reduce
+from operator import getitem
+from types import MappingProxyType
 
+import pytest
 from vector_store import SearchResults
 
+# Read-only ChromaDB query payloads shared by the from_chroma tests
+_CHROMA_TWO_DOCS = MappingProxyType(
+    {
+        "documents": [["doc1", "doc2"]],
+        "metadatas": [[{}, {}]],
+        "distances": [[0.3, 0.5]],
+    }
+)
+_CHROMA_ML_METADATA = MappingProxyType(
+    {
+        "documents": [["doc"]],
+        "metadatas": [[{"course_title": "ML", "lesson_number": 1}]],
+        "distances": [[0.3]],
+    }
+)
+_CHROMA_DISTANCES = MappingProxyType(
+    {
+        "documents": [["doc1", "doc2"]],
+        "metadatas": [[{}, {}]],
+        "distances": [[0.25, 0.75]],
+    }
+)
+_CHROMA_EMPTY = MappingProxyType({"documents": [], "metadatas": [], "distances": []})
+_CHROMA_EMPTY_NESTED = MappingProxyType(
+    {"documents": [[]], "metadatas": [[]], "distances": [[]]}
+)
+
 
 class TestSearchResultsCreation:
     """Tests for SearchResults creation."""
@@ -51,46 +77,26 @@ class TestSearchResultsFromChroma:
 
     def test_from_chroma_extracts_documents(self):
         """Verify documents are extracted from ChromaDB format."""
-        chroma_results = {
-            "documents": [["doc1", "doc2"]],
-            "metadatas": [[{}, {}]],
-            "distances": [[0.3, 0.5]],
-        }
-
-        results = SearchResults.from_chroma(chroma_results)
+        results = SearchResults.from_chroma(_CHROMA_TWO_DOCS)
 
         assert results.documents == ["doc1", "doc2"]
 
     def test_from_chroma_extracts_metadata(self):
         """Verify metadata is extracted from ChromaDB format."""
-        chroma_results = {
-            "documents": [["doc"]],
-            "metadatas": [[{"course_title": "ML", "lesson_number": 1}]],
-            "distances": [[0.3]],
-        }
-
-        results = SearchResults.from_chroma(chroma_results)
+        results = SearchResults.from_chroma(_CHROMA_ML_METADATA)
 
         assert results.metadata[0]["course_title"] == "ML"
         assert results.metadata[0]["lesson_number"] == 1
 
     def test_from_chroma_extracts_distances(self):
         """Verify distances are extracted from ChromaDB format."""
-        chroma_results = {
-            "documents": [["doc1", "doc2"]],
-            "metadatas": [[{}, {}]],
-            "distances": [[0.25, 0.75]],
-        }
-
-        results = SearchResults.from_chroma(chroma_results)
+        results = SearchResults.from_chroma(_CHROMA_DISTANCES)
 
         assert results.distances == [0.25, 0.75]
 
     def test_from_chroma_handles_empty_results(self):
         """Verify empty ChromaDB results are handled."""
-        chroma_results = {"documents": [], "metadatas": [], "distances": []}
-
-        results = SearchResults.from_chroma(chroma_results)
+        results = SearchResults.from_chroma(_CHROMA_EMPTY)
 
         assert results.documents == []
         assert results.metadata == []
@@ -98,9 +104,7 @@ class TestSearchResultsFromChroma:
 
     def test_from_chroma_handles_none_in_nested_arrays(self):
         """Verify handling of nested empty arrays."""
-        chroma_results = {"documents": [[]], "metadatas": [[]], "distances": [[]]}
-
-        results = SearchResults.from_chroma(chroma_results)
+        results = SearchResults.from_chroma(_CHROMA_EMPTY_NESTED)
 
         assert results.documents == []
         assert results.metadata == []
@@ -163,27 +167,42 @@ class TestSearchResultsIsEmpty:
 class TestSearchResultsAttributes:
     """Tests for attribute access."""
 
-    def test_documents_accessible(self):
-        """Verify documents attribute is accessible."""
-        results = SearchResults(
-            documents=["content here"], metadata=[{}], distances=[0.0]
-        )
-
-        assert results.documents[0] == "content here"
-
-    def test_metadata_accessible(self):
-        """Verify metadata attribute is accessible."""
-        results = SearchResults(
-            documents=["doc"], metadata=[{"title": "Test Course"}], distances=[0.0]
-        )
-
-        assert results.metadata[0]["title"] == "Test Course"
-
-    def test_distances_accessible(self):
-        """Verify distances attribute is accessible."""
-        results = SearchResults(documents=["doc"], metadata=[{}], distances=[0.42])
-
-        assert results.distances[0] == 0.42
+    @pytest.mark.parametrize(
+        "kwargs, attribute, keys, expected",
+        [
+            pytest.param(
+                {"documents": ["content here"], "metadata": [{}], "distances": [0.0]},
+                "documents",
+                (0,),
+                "content here",
+                id="documents",
+            ),
+            pytest.param(
+                {
+                    "documents": ["doc"],
+                    "metadata": [{"title": "Test Course"}],
+                    "distances": [0.0],
+                },
+                "metadata",
+                (0, "title"),
+                "Test Course",
+                id="metadata",
+            ),
+            pytest.param(
+                {"documents": ["doc"], "metadata": [{}], "distances": [0.42]},
+                "distances",
+                (0,),
+                0.42,
+                id="distances",
+            ),
+        ],
+    )
+    def test_attribute_accessible(self, kwargs, attribute, keys, expected):
+        """Verify constructor values are reachable through each attribute."""
+        results = SearchResults(**kwargs)
+
+        value = reduce(getitem, keys, getattr(results, attribute))
+        assert value == expected
 
     def test_all_lists_same_length(self):
         """Verify all lists maintain same length relationship."""
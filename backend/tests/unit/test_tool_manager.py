@@ -6,17 +6,13 @@ Tests evaluate:
 2. Tool definition retrieval
 3. Tool execution dispatch
 4. Source tracking and reset
+5. Isolated execution that returns sources with the result
 """
 
-import sys
-from pathlib import Path
-from unittest.mock import MagicMock
+from types import MappingProxyType
+from unittest.mock import Mock
 
 import pytest
-
-# Add backend to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-
 from search_tools import Tool, ToolManager
 
 
@@ -28,13 +24,17 @@ class MockTool(Tool):
         self._has_sources = has_sources
         if has_sources:
             self.last_sources = []
+        # Built once and read-only, as callers only inspect definitions
+        self._definition = MappingProxyType(
+            {
+                "name": name,
+                "description": f"Mock tool: {name}",
+                "input_schema": {"type": "object", "properties": {}},
+            }
+        )
 
     def get_tool_definition(self):
-        return {
-            "name": self._name,
-            "description": f"Mock tool: {self._name}",
-            "input_schema": {"type": "object", "properties": {}},
-        }
+        return self._definition
 
     def execute(self, **kwargs):
         if self._has_sources:
@@ -81,7 +81,7 @@ class TestToolManagerRegistration:
         manager = ToolManager()
 
         # Create tool with broken definition
-        bad_tool = MagicMock()
+        bad_tool = Mock(spec=["get_tool_definition"])
         bad_tool.get_tool_definition.return_value = {"description": "No name"}
 
         with pytest.raises(ValueError, match="must have a 'name'"):
@@ -91,13 +91,17 @@ class TestToolManagerRegistration:
 class TestToolManagerDefinitions:
     """Tests for tool definition retrieval."""
 
-    def test_get_tool_definitions_returns_all_definitions(self):
-        """Verify all tool definitions are returned."""
+    @pytest.fixture(scope="class")
+    def definitions_manager(self):
+        """ToolManager with two tools; only read by these tests."""
         manager = ToolManager()
         manager.register_tool(MockTool("tool_a"))
         manager.register_tool(MockTool("tool_b"))
+        return manager
 
-        definitions = manager.get_tool_definitions()
+    def test_get_tool_definitions_returns_all_definitions(self, definitions_manager):
+        """Verify all tool definitions are returned."""
+        definitions = definitions_manager.get_tool_definitions()
 
         assert len(definitions) == 2
         names = [d["name"] for d in definitions]
@@ -113,46 +117,49 @@ class TestToolManagerDefinitions:
         assert definitions == []
 
 
-class TestToolManagerExecution:
-    """Tests for tool execution dispatch."""
-
-    def test_execute_tool_calls_correct_tool(self):
-        """Verify correct tool is called by name."""
-        manager = ToolManager()
-        tool = MockTool("search_tool")
-        manager.register_tool(tool)
-
-        result = manager.execute_tool("search_tool", query="test")
+@pytest.fixture(scope="module")
+def execution_manager():
+    """ToolManager with source-less tools; executing them leaves no state behind."""
+    manager = ToolManager()
+    for name in ("search_tool", "my_tool", "test"):
+        manager.register_tool(MockTool(name))
+    return manager
 
-        assert "Executed search_tool" in result
 
-    def test_execute_tool_passes_kwargs(self):
-        """Verify kwargs are passed to tool."""
-        manager = ToolManager()
-        tool = MockTool("my_tool")
-        manager.register_tool(tool)
-
-        result = manager.execute_tool("my_tool", param1="value1", param2="value2")
-
-        assert "param1" in result
-        assert "value1" in result
-
-    def test_execute_tool_returns_not_found_for_unknown(self):
-        """Verify error message for unknown tool."""
-        manager = ToolManager()
-
-        result = manager.execute_tool("nonexistent_tool")
-
-        assert "Tool 'nonexistent_tool' not found" in result
-
-    def test_execute_tool_returns_string(self):
-        """Verify execute returns string result."""
-        manager = ToolManager()
-        manager.register_tool(MockTool("test"))
+class TestToolManagerExecution:
+    """Tests for tool execution dispatch."""
 
-        result = manager.execute_tool("test")
+    @pytest.mark.parametrize(
+        "tool_name, kwargs, expected",
+        [
+            pytest.param(
+                "search_tool",
+                {"query": "test"},
+                ["Executed search_tool"],
+                id="calls_correct_tool",
+            ),
+            pytest.param(
+                "my_tool",
+                {"param1": "value1", "param2": "value2"},
+                ["param1", "value1"],
+                id="passes_kwargs",
+            ),
+            pytest.param(
+                "nonexistent_tool",
+                {},
+                ["Tool 'nonexistent_tool' not found"],
+                id="unknown_tool_not_found",
+            ),
+            pytest.param("test", {}, ["Executed test"], id="no_kwargs"),
+        ],
+    )
+    def test_execute_tool(self, execution_manager, tool_name, kwargs, expected):
+        """Verify dispatch by name returns the tool's string result."""
+        result = execution_manager.execute_tool(tool_name, **kwargs)
 
         assert isinstance(result, str)
+        for text in expected:
+            assert text in result
 
 
 class TestToolManagerSourceTracking:
@@ -224,3 +231,49 @@ class TestToolManagerSourceTracking:
         manager.reset_sources()
 
         assert manager.get_last_sources() == []
+
+
+class TestToolManagerIsolatedExecution:
+    """Tests for execute_tool_with_sources and record_sources."""
+
+    def test_returns_result_and_sources_without_touching_tool(self):
+        """Verify the call's sources come back with its result, not via the tool."""
+        manager = ToolManager()
+        tool = MockTool("search", has_sources=True)
+        manager.register_tool(tool)
+
+        result, sources = manager.execute_tool_with_sources("search", query="q")
+
+        assert result == "Executed search with {'query': 'q'}"
+        assert sources == [{"source": "test"}]
+        assert tool.last_sources == []
+        assert manager.get_last_sources() == []
+
+    def test_tool_without_sources_returns_empty_list(self):
+        """Verify tools that track no sources report none."""
+        manager = ToolManager()
+        manager.register_tool(MockTool("outline"))
+
+        _, sources = manager.execute_tool_with_sources("outline")
+
+        assert sources == []
+
+    def test_unknown_tool_returns_error_and_no_sources(self):
+        """Verify unknown tools are reported like execute_tool does."""
+        manager = ToolManager()
+
+        result, sources = manager.execute_tool_with_sources("missing")
+
+        assert result == "Tool 'missing' not found"
+        assert sources == []
+
+    def test_record_sources_keeps_non_empty_sources(self):
+        """Verify recorded sources become the manager's last sources."""
+        manager = ToolManager()
+        manager.register_tool(MockTool("search", has_sources=True))
+        sources = [{"source": "recorded"}]
+
+        manager.record_sources("search", sources)
+        manager.record_sources("search", [])
+
+        assert manager.get_last_sources() == sources
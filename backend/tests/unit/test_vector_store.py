@@ -0,0 +1,44 @@
+"""
+Unit tests for VectorStore construction.
+
+Tests evaluate:
+1. Sharing the embedding function's loaded model
+2. Failing loudly when chromadb stops exposing that model
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+from vector_store import VectorStore
+
+
+@pytest.fixture
+def embedding_function_class():
+    """Patch ChromaDB's client and embedding function; yield the latter's class."""
+    with (
+        patch("chromadb.PersistentClient"),
+        patch(
+            "chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction"
+        ) as function_class,
+    ):
+        yield function_class
+
+
+class TestVectorStoreEmbedder:
+    """Tests for VectorStore.embedder."""
+
+    def test_embedder_is_embedding_function_model(self, embedding_function_class):
+        """Verify the store reuses the model loaded by the embedding function."""
+        model = Mock()
+        embedding_function_class.return_value = Mock(_model=model)
+
+        store = VectorStore("./test_chroma", "test-model")
+
+        assert store.embedder is model
+
+    def test_missing_model_attribute_raises(self, embedding_function_class):
+        """Verify a chromadb without the private _model attribute fails at startup."""
+        embedding_function_class.return_value = Mock(spec=[])
+
+        with pytest.raises(RuntimeError, match="_model"):
+            VectorStore("./test_chroma", "test-model")
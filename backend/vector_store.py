@@ -1,8 +1,7 @@
+from collections.abc import Sequence
 from dataclasses import dataclass
 from typing import Any
 
-import chromadb
-from chromadb.config import Settings
 from models import Course, CourseChunk
 
 
@@ -10,9 +9,10 @@ from models import Course, CourseChunk
 class SearchResults:
     """Container for search results with metadata"""
 
-    documents: list[str]
-    metadata: list[dict[str, Any]]
-    distances: list[float]
+    # Consumers only iterate these, so any read-only sequence (e.g. a tuple) works
+    documents: Sequence[str]
+    metadata: Sequence[dict[str, Any]]
+    distances: Sequence[float]
     error: str | None = None
 
     @classmethod
@@ -44,6 +44,11 @@ class VectorStore:
     """Vector storage using ChromaDB for course content and metadata"""
 
     def __init__(self, chroma_path: str, embedding_model: str, max_results: int = 5):
+        # ChromaDB is slow to import; deferring it keeps modules that only
+        # need SearchResults (tools, tests) cheap to import
+        import chromadb
+        from chromadb.config import Settings
+
         self.max_results = max_results
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(
@@ -56,6 +61,16 @@ class VectorStore:
                 model_name=embedding_model
             )
         )
+        # The loaded SentenceTransformer, shared with other components that
+        # need embeddings so the model is only held in memory once. chromadb
+        # exposes it only as a private attribute, so fail loudly if it moves.
+        self.embedder = getattr(self.embedding_function, "_model", None)
+        if self.embedder is None:
+            raise RuntimeError(
+                "SentenceTransformerEmbeddingFunction no longer exposes its "
+                "loaded model as _model; update VectorStore for the installed "
+                f"chromadb version ({chromadb.__version__})"
+            )
 
         # Create collections for different types of data
         self.course_catalog = self._create_collection(